@@ -0,0 +1,502 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from contextlib import ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import rss_mb
+
+# --- CONFIGURATION ---
+
+MODEL_PATH = '../../models/ensemble_pipeline_id1_0_89.joblib'
+RESULTS_DIR = '../../benchmarks/results'
+
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+SEED = 42
+
+CHUNK_SIZE = 10000          # Documents generated (and vectorized) at a time, so 1M documents never sit in memory
+PREDICT_BATCH_SIZE = 256
+SINGLE_PREDICTIONS = 200    # One-by-one predictions timed per corpus size
+PREPROCESS_DOCS = 2000      # spaCy is slow; the preprocessing benchmark uses at most this many documents
+FEED_ENTRIES = 500
+FEED_POLLS = 20
+ARTICLES = 200              # Articles downloaded + parsed from the local servers
+DOWNLOAD_HOSTS = 4          # Local servers (separate hosts for the per-host limit) the articles are spread over
+LOAD_REPEATS = 5
+REGRESSION_THRESHOLD = 0.10
+
+BENCHMARKS = ["feed", "download", "extract", "preprocess", "vectorize", "predict_single", "predict_batch", "load"]
+
+# Vocabulary of the synthetic corpora: common (lemmatized) Hungarian words, plus words
+# that are more frequent in one of the two classes, so the model sees realistic features
+COMMON_WORDS = (
+    "kormány ország magyar ember év nap hét hónap város falu iskola kórház munka bér ár pénz forint "
+    "adó gazdaság cég piac bank szakértő kutatás adat szerint mond tart ad vesz kap lesz van új nagy "
+    "kis jó rossz sok kevés első utolsó fontos lehet kell tud akar miniszter polgármester képviselő "
+    "parlament törvény javaslat szavazás választás párt ellenzék oktatás egészségügy közlekedés vasút "
+    "út híd energia gáz áram víz környezet klíma időjárás sport kultúra színház könyv film zene"
+).split()
+CLASS_WORDS = {
+    0: "vizsgálat elemzés forrás dokumentum nyilatkozat statisztika átláthatóság jelentés bíróság ügyészség".split(),
+    1: "brüsszel soros migráció szuverenitás háború béke baloldal nemzeti veszély támadás család".split()
+}
+NUM_TOKEN = "NUM"
+
+
+# --- SYNTHETIC DATA ---
+
+def synthetic_documents(n: int, seed: int = SEED, min_words: int = 80, max_words: int = 300):
+    """Yields n reproducible (text, label) pairs that look like preprocessed Hungarian articles."""
+    rng = random.Random(seed)
+    for i in range(n):
+        label = i % 2
+        length = rng.randint(min_words, max_words)
+        words = rng.choices(COMMON_WORDS, k=length)
+        for position in rng.sample(range(length), k=length // 15):
+            words[position] = rng.choice(CLASS_WORDS[label])
+        if rng.random() < 0.3:
+            words[rng.randrange(length)] = NUM_TOKEN
+        yield " ".join(words), label
+
+
+def synthetic_chunks(n: int, chunk_size: int = CHUNK_SIZE, seed: int = SEED):
+    """Yields the same documents as synthetic_documents in (texts, labels) chunks."""
+    texts, labels = [], []
+    for text, label in synthetic_documents(n, seed):
+        texts.append(text)
+        labels.append(label)
+        if len(texts) == chunk_size:
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+def synthetic_title(rng: random.Random, i: int) -> str:
+    words = rng.choices(COMMON_WORDS, k=6)
+    if i % 3 == 0:
+        words[2] = rng.choice(CLASS_WORDS[1])
+    return " ".join(words).capitalize()
+
+
+def article_html(i: int, seed: int = SEED) -> str:
+    """A synthetic article page with the markup of telex.hu (see extractors.DOMAIN_SELECTORS)."""
+    rng = random.Random(seed + i)
+    title = synthetic_title(rng, i)
+    paragraphs = "\n".join(
+        f"<p>{' '.join(rng.choices(COMMON_WORDS, k=rng.randint(30, 60))).capitalize()}.</p>" for _ in range(8)
+    )
+    return (
+        "<!DOCTYPE html><html lang=\"hu\"><head><meta charset=\"utf-8\">"
+        f"<title>{title} | Telex</title><meta property=\"og:title\" content=\"{title}\"></head>"
+        "<body><header><nav><a href=\"/belfold\">Belföld</a><a href=\"/kulfold\">Külföld</a></nav></header>"
+        f"<main><h1>{title}</h1><div class=\"article-html-content\">{paragraphs}</div>"
+        "<aside><p>Kapcsolódó cikkek</p></aside></main><footer><p>Minden jog fenntartva.</p></footer></body></html>"
+    )
+
+
+def feed_xml(base_url: str, entries: int = FEED_ENTRIES, seed: int = SEED) -> str:
+    """A synthetic RSS feed whose items link to the local article pages."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(entries):
+        title = synthetic_title(rng, i)
+        summary = " ".join(rng.choices(COMMON_WORDS, k=25))
+        published = time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(1700000000 + i * 60))
+        items.append(f"<item><title>{title}</title><link>{base_url}/article/{i}</link>"
+                     f"<description>{summary}</description><pubDate>{published}</pubDate></item>")
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><rss version=\"2.0\"><channel>"
+            f"<title>Benchmark feed</title><link>{base_url}</link><description>Synthetic</description>"
+            + "".join(items) + "</channel></rss>")
+
+
+class FixtureServer:
+    """Local HTTP server with a canned RSS feed (/feed.xml) and article pages (/article/<i>)."""
+
+    def __init__(self, entries: int = FEED_ENTRIES):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.feed = feed_xml(self.base_url, entries).encode("utf-8")
+        self._pages = {}
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def page(self, i: int) -> bytes:
+        if i not in self._pages:
+            self._pages[i] = article_html(i).encode("utf-8")
+        return self._pages[i]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/feed.xml":
+                    body, content_type = server.feed, "application/rss+xml; charset=utf-8"
+                elif self.path.startswith("/article/") and self.path[9:].isdigit():
+                    body, content_type = server.page(int(self.path[9:])), "text/html; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- MEASUREMENT ---
+
+class Skipped(Exception):
+    """Raised by a benchmark that doesn't apply to the given setup (e.g. the model type)."""
+
+class PeakMemory:
+    """Samples the resident memory in a background thread and keeps the peak (None without psutil)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        if self.peak is not None:
+            self._thread.join()
+            self.peak = max(self.peak, rss_mb())
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name: str, size: str, bench, *args) -> dict:
+    """
+    Runs one benchmark. bench returns {'n': items processed, 'latencies': [seconds per call]}
+    and optionally 'seconds' (the timed part, if setup happens in between).
+    """
+    print(f"Running {name} ({size})...")
+    result = {"name": name, "size": size}
+    try:
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            stats = bench(*args)
+            seconds = stats.get("seconds", time.perf_counter() - start)
+    except (ImportError, FileNotFoundError, Skipped) as e:
+        print(f"  Skipped: {e}")
+        result["skipped"] = str(e)
+        return result
+
+    if not stats["n"]:
+        print("  Skipped: nothing was processed")
+        result["skipped"] = "nothing was processed"
+        return result
+
+    latencies = stats.get("latencies") or []
+    result.update({
+        "n": stats["n"],
+        "seconds": round(seconds, 4),
+        "throughput": round(stats["n"] / seconds, 2) if seconds > 0 else None,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "peak_rss_mb": round(memory.peak, 1) if memory.peak is not None else None
+    })
+    print(f"  {result['throughput']} items/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+    return result
+
+
+# --- BENCHMARKS ---
+
+def bench_feed(server: FixtureServer, polls: int = FEED_POLLS) -> dict:
+    """Feed parsing + keyword filtering (collect_urls.poll_feed) of the local feed."""
+    from collect_urls import KEYWORDS, poll_feed
+    from keyword_matcher import KeywordMatcher
+
+    matcher = KeywordMatcher(KEYWORDS + CLASS_WORDS[1])
+    latencies = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        poll_feed(server.base_url + "/feed.xml", matcher)
+        latencies.append(time.perf_counter() - start)
+    return {"n": polls * FEED_ENTRIES, "latencies": latencies}
+
+
+def bench_download(articles: int = ARTICLES, hosts: int = DOWNLOAD_HOSTS) -> dict:
+    """
+    downloader.download_articles (the engine of process_articles, with its window, host interleaving
+    and per-host limit) over the article pages of several local servers, each one a separate host.
+    The pages are unknown domains to the extractors, so they are parsed by newspaper, like every page of
+    a domain not in extractors.ENABLED_DOMAINS. Latencies are the gaps between completed articles.
+    """
+    import newspaper  # noqa: F401 (parse dependency, checked up front so a missing one skips the benchmark)
+    from downloader import download_articles
+
+    with ExitStack() as stack:
+        servers = [stack.enter_context(FixtureServer(entries=0)) for _ in range(hosts)]
+        urls = [f"{servers[i % hosts].base_url}/article/{i}" for i in range(articles)]
+
+        latencies, failed = [], 0
+        start = last = time.perf_counter()
+        for _, _, error in download_articles(urls):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+            if error is not None:
+                failed += 1
+        seconds = last - start
+
+    if failed:
+        print(f"  Warning: {failed} downloads failed")
+    return {"n": articles - failed, "latencies": latencies, "seconds": seconds}
+
+
+def bench_extract(articles: int = ARTICLES) -> dict:
+    """Per-domain selector extraction (extractors.extract_with_selectors, enabled or not) of the article pages."""
+    from extractors import extract_with_selectors
+
+    pages = [article_html(i) for i in range(articles)]
+    latencies = []
+    for i, html in enumerate(pages):
+        start = time.perf_counter()
+        extract_with_selectors(f"https://telex.hu/belfold/benchmark/{i}", html, enabled_only=False)
+        latencies.append(time.perf_counter() - start)
+    return {"n": len(pages), "latencies": latencies, "seconds": sum(latencies)}
+
+
+def bench_preprocess(n: int) -> dict:
+    """
+    spaCy cleaning (preprocessing.preprocess_texts) without the cache, in this process.
+    The latency of a document is the wait for it as seen by the consumer: nlp.pipe works in
+    batches, so the first document of a batch carries most of the batch's time (and the p99).
+    """
+    from preprocessing import get_nlp, preprocess_texts
+
+    get_nlp()  # The model load is measured by bench_load, not here
+    texts = [text for text, _ in synthetic_documents(min(n, PREPROCESS_DOCS))]
+    latencies = []
+    start = last = time.perf_counter()
+    for _ in preprocess_texts(texts, n_process=1, cache_path=None):
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+    return {"n": len(texts), "latencies": latencies, "seconds": last - start}
+
+
+def bench_vectorize(model, n: int) -> dict:
+    """Vectorization (every pipeline step but the classifier) in chunks of CHUNK_SIZE documents."""
+    from classifier import _vectorize
+
+    if not hasattr(model, "steps"):
+        raise Skipped("compiled models vectorize and predict in one step (see predict_single / predict_batch)")
+
+    latencies, count = [], 0
+    for texts, _ in synthetic_chunks(n):
+        start = time.perf_counter()
+        _vectorize(model, texts)
+        latencies.append(time.perf_counter() - start)
+        count += len(texts)
+    return {"n": count, "latencies": latencies, "seconds": sum(latencies)}
+
+
+def bench_predict_single(model, n: int) -> dict:
+    """One score_texts call per document (the interactive path, without preprocessing)."""
+    from classifier import score_texts
+
+    texts = [text for text, _ in synthetic_documents(min(n, SINGLE_PREDICTIONS))]
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        score_texts(model, [text], preprocess=False)
+        latencies.append(time.perf_counter() - start)
+    return {"n": len(texts), "latencies": latencies, "seconds": sum(latencies)}
+
+
+def bench_predict_batch(model, n: int) -> dict:
+    """score_texts over batches of PREDICT_BATCH_SIZE documents (the bulk scoring path)."""
+    from classifier import score_texts
+
+    latencies, count = [], 0
+    for texts, _ in synthetic_chunks(n):
+        for i in range(0, len(texts), PREDICT_BATCH_SIZE):
+            batch = texts[i:i + PREDICT_BATCH_SIZE]
+            start = time.perf_counter()
+            score_texts(model, batch, preprocess=False)
+            latencies.append(time.perf_counter() - start)
+            count += len(batch)
+    return {"n": count, "latencies": latencies, "seconds": sum(latencies)}
+
+
+def bench_load(model_path: str, mmap: bool, repeats: int = LOAD_REPEATS) -> dict:
+    """Model load time (model_loader.load_model); after the first run the file is in the page cache."""
+    from model_loader import load_model
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_model(model_path, mmap=mmap)
+        latencies.append(time.perf_counter() - start)
+    return {"n": repeats, "latencies": latencies}
+
+
+# --- RUNNER ---
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes: list, model_path: str = MODEL_PATH, benchmarks: list = None,
+              results_dir: str = RESULTS_DIR) -> str:
+    """Runs the selected benchmarks and writes the results as JSON. Returns the path of the results file."""
+    benchmarks = benchmarks or BENCHMARKS
+    results = []
+
+    # 1. Network and parsing, against local fixture servers
+    if "feed" in benchmarks:
+        with FixtureServer() as server:
+            results.append(measure("feed", "-", bench_feed, server))
+    if "download" in benchmarks:
+        results.append(measure("download", "-", bench_download))
+    if "extract" in benchmarks:
+        results.append(measure("extract", "-", bench_extract))
+
+    # 2. Model load
+    if "load" in benchmarks:
+        results.append(measure("load_mmap", "-", bench_load, model_path, True))
+        results.append(measure("load_no_mmap", "-", bench_load, model_path, False))
+
+    # 3. Text processing and prediction, at every corpus size
+    model = None
+    if {"vectorize", "predict_single", "predict_batch"} & set(benchmarks):
+        try:
+            from model_loader import load_model
+            model = load_model(model_path)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"Skipping the model benchmarks: {e}")
+
+    for size in sizes:
+        n = SIZES[size]
+        if "preprocess" in benchmarks:
+            results.append(measure("preprocess", size, bench_preprocess, n))
+        if model is not None:
+            if "vectorize" in benchmarks:
+                results.append(measure("vectorize", size, bench_vectorize, model, n))
+            if "predict_single" in benchmarks:
+                results.append(measure("predict_single", size, bench_predict_single, model, n))
+            if "predict_batch" in benchmarks:
+                results.append(measure("predict_batch", size, bench_predict_batch, model, n))
+
+    # 4. Save
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": os.path.basename(model_path),
+        "seed": SEED,
+        "results": results
+    }
+    os.makedirs(results_dir, exist_ok=True)
+    output_path = os.path.join(results_dir, f"benchmark_{commit}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Results saved to {output_path}")
+    return output_path
+
+
+def _change(new, old):
+    """Relative change between two measurements, or None if either is missing (or the old one is 0)."""
+    if new is None or not old:
+        return None
+    return new / old - 1
+
+
+def _format_change(change) -> str:
+    return f"{change:+.1%}" if change is not None else "n/a"
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = REGRESSION_THRESHOLD) -> bool:
+    """
+    Prints the throughput and p99 changes between two result files.
+    Returns False if any benchmark got slower than the threshold (e.g. 0.10 = 10%).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    previous = {(row["name"], row["size"]): row for row in baseline["results"] if "skipped" not in row}
+    ok = True
+
+    print(f"{baseline['commit']} -> {current['commit']}")
+    print(f"{'benchmark':<16} {'size':<6} {'throughput':>12} {'p99':>10}")
+    for row in current["results"]:
+        old = previous.get((row["name"], row["size"]))
+        if old is None or "skipped" in row:
+            continue
+
+        throughput_change = _change(row.get("throughput"), old.get("throughput"))
+        p99_change = _change(row.get("p99_ms"), old.get("p99_ms"))
+        regression = ((throughput_change is not None and throughput_change < -threshold)
+                      or (p99_change is not None and p99_change > threshold))
+        ok = ok and not regression
+
+        print(f"{row['name']:<16} {row['size']:<6} {_format_change(throughput_change):>12} "
+              f"{_format_change(p99_change):>10}{'  REGRESSION' if regression else ''}")
+
+    return ok
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks on synthetic corpora and local HTTP fixtures.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["1k"])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=None, help="Run only these benchmarks.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of running the benchmarks.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        raise SystemExit(0 if compare(*args.compare, threshold=args.threshold) else 1)
+
+    run_suite(args.sizes, args.model, args.only)
@@ -0,0 +1,251 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from url_store import canonicalize_url
+
+# --- CONFIGURATION ---
+
+DEFAULT_CACHE_PATH = "../../data/prediction_cache.sqlite"
+
+TEXT_TTL = 6 * 60 * 60                     # Seconds before a cached article is revalidated
+TEXT_MEMORY_BYTES = 64 * 1024 * 1024       # In-memory budget of the URL -> text tier
+PREDICTION_MEMORY_BYTES = 8 * 1024 * 1024  # In-memory budget of the content -> prediction tier
+PREDICTION_ENTRY_BYTES = 128               # Rough size of one cached (label, score) entry
+FETCH_TIMEOUT = 15                         # Seconds
+
+
+# --- FUNCTIONS ---
+
+def model_fingerprint(model) -> str:
+    """Content hash of a loaded model; any retrained or different model gets a different one."""
+    import joblib
+    return joblib.hash(model)
+
+
+def content_key(text: str, preprocess: bool = True) -> str:
+    """Key of a text in the prediction tier (the model fingerprint is added by PredictionCache)."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(b"1" if preprocess else b"0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LruCache:
+    """Thread-safe LRU mapping bounded by the total (estimated) size of its values in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PredictionCache:
+    """
+    Two-level cache in front of predict_bias:
+    - URL -> extracted text, revalidated with ETag / Last-Modified once older than text_ttl
+    - content hash + model fingerprint -> (label index, propaganda score)
+
+    Both levels have a bounded in-memory LRU tier and, if path is given, an SQLite tier
+    that survives restarts. Predictions of any other model are dropped from disk on startup.
+    """
+
+    def __init__(self, model, path: str = None, text_ttl: float = TEXT_TTL,
+                 text_memory_bytes: int = TEXT_MEMORY_BYTES,
+                 prediction_memory_bytes: int = PREDICTION_MEMORY_BYTES, fingerprint: str = None):
+        self.fingerprint = fingerprint or model_fingerprint(model)
+        self.text_ttl = text_ttl
+        self._texts = LruCache(text_memory_bytes)
+        self._predictions = LruCache(prediction_memory_bytes)
+        self._lock = threading.Lock()
+        self.conn = None
+
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS texts (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS predictions (
+                    key TEXT PRIMARY KEY,
+                    label INTEGER NOT NULL,
+                    score REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS meta (
+                    name TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+            self._check_model()
+
+    def _check_model(self):
+        """Invalidates the disk prediction tier if it was written by a different model."""
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'model'").fetchone()
+        if row and row[0] == self.fingerprint:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM predictions")
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('model', ?)", (self.fingerprint,))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # --- URL -> text tier ---
+
+    def _load_text_entry(self, key: str):
+        entry = self._texts.get(key)
+        if entry is None and self.conn is not None:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT text, etag, last_modified, fetched_at FROM texts WHERE key = ?", (key,)
+                ).fetchone()
+            if row:
+                entry = {"text": row[0], "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+                self._texts.put(key, entry, len(entry["text"].encode("utf-8")))
+        return entry
+
+    def _store_text_entry(self, key: str, entry: dict):
+        self._texts.put(key, entry, len(entry["text"].encode("utf-8")))
+        if self.conn is not None:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO texts (key, text, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, entry["text"], entry["etag"], entry["last_modified"], entry["fetched_at"])
+                )
+
+    def get_text(self, url: str):
+        """
+        Returns the article text of a URL: from the cache while it is fresh, after a conditional
+        GET once it is stale, and downloaded and parsed otherwise. Returns None if extraction fails.
+        """
+        key = canonicalize_url(url)
+        entry = self._load_text_entry(key)
+
+        if entry is not None and time.time() - entry["fetched_at"] < self.text_ttl:
+            metrics.increment("cache", "text_hit")
+            return entry["text"]
+
+        try:
+            text, etag, last_modified = _fetch_text(url, entry)
+        except Exception as e:
+            print(f"Error downloading article: {e}")
+            # A stale copy beats no answer when the site is down
+            return entry["text"] if entry is not None else None
+
+        if text is None:
+            metrics.increment("cache", "text_revalidated")
+            text = entry["text"]
+        else:
+            metrics.increment("cache", "text_miss")
+            if not text:
+                return None
+
+        self._store_text_entry(key, {"text": text, "etag": etag, "last_modified": last_modified,
+                                     "fetched_at": time.time()})
+        return text
+
+    # --- content -> prediction tier ---
+
+    def _prediction_key(self, text: str, preprocess: bool) -> str:
+        return f"{self.fingerprint}:{content_key(text, preprocess)}"
+
+    def get_prediction(self, text: str, preprocess: bool = True):
+        """Cached (label index, propaganda score) of a text for the current model, or None."""
+        key = self._prediction_key(text, preprocess)
+        prediction = self._predictions.get(key)
+
+        if prediction is None and self.conn is not None:
+            with self._lock:
+                row = self.conn.execute("SELECT label, score FROM predictions WHERE key = ?", (key,)).fetchone()
+            if row:
+                prediction = (row[0], row[1])
+                self._predictions.put(key, prediction, PREDICTION_ENTRY_BYTES)
+
+        metrics.increment("cache", "prediction_hit" if prediction is not None else "prediction_miss")
+        return prediction
+
+    def put_predictions(self, texts: list, predictions: list, preprocess: bool = True):
+        """Stores one (label index, propaganda score) tuple per text."""
+        rows = []
+        for text, (label, score) in zip(texts, predictions):
+            key = self._prediction_key(text, preprocess)
+            self._predictions.put(key, (label, score), PREDICTION_ENTRY_BYTES)
+            rows.append((key, label, score))
+
+        if self.conn is not None and rows:
+            with self._lock, self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO predictions (key, label, score) VALUES (?, ?, ?)", rows)
+
+
+def _fetch_text(url: str, entry: dict = None) -> tuple:
+    """
+    Downloads and parses a URL, revalidating the cached entry if there is one.
+    Returns (text, etag, last_modified); text is None if the server answered 304 Not Modified.
+    """
+    import requests
+    from downloader import HEADERS, decode_html, parse_article
+
+    headers = dict(HEADERS)
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with metrics.stage("fetch"):
+        response = requests.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+
+    if response.status_code == 304 and entry is not None:
+        return None, entry["etag"], entry["last_modified"]
+
+    response.raise_for_status()
+    html = decode_html(response)
+    metrics.observe("fetch_bytes", len(response.content))
+
+    with metrics.stage("parse"):
+        article = parse_article(url, html)
+
+    # Combine title and text for better accuracy (same as classifier.fetch_article_content)
+    text = f"{article['title']} {article['text']}" if article["text"] else ""
+    return text, response.headers.get("ETag"), response.headers.get("Last-Modified")
@@ -1,103 +1,244 @@
 import numpy as np
-from newspaper import Article
+
+import metrics
+from preprocessing import preprocess_texts
 
 LABELS = {0: "Neutral rhetoric", 1: "Propagandistic rhetoric"}
 
+# Status values of a batch prediction result
+STATUS_OK = "ok"
+STATUS_FETCH_ERROR = "fetch_error"
+STATUS_PREDICTION_ERROR = "prediction_error"
+
+
 def fetch_article_content(url):
     """Downloads and parses the article text from a URL."""
+    # requests and lxml (and newspaper, for unknown domains) are only imported once a URL is actually given
+    from downloader import fetch_html, parse_article
+
     try:
-        article = Article(url)
-        article.download()
-        article.parse()
+        # Network errors and HTTP statuses surface here as DownloadError (with the status code)
+        with metrics.stage("fetch"):
+            html = fetch_html(url)
+        metrics.observe("fetch_bytes", len(html.encode("utf-8")))
+
+        with metrics.stage("parse"):
+            parsed = parse_article(url, html)
 
-        if not article.text:
+        if not parsed["text"]:
+            metrics.increment("errors", "parse", "EmptyText")
             return None
 
         # Combine title and text for better accuracy
-        return f"{article.title} {article.text}"
+        return f"{parsed['title']} {parsed['text']}"
     except Exception as e:
         print(f"Error downloading article: {e}")
         return None
 
 
-def _calculate_manual_confidence(model, text, predicted_class):
+def _vectorize(model, texts):
+    """Runs every pipeline step except the final estimator once over the whole batch."""
+    with metrics.stage("vectorize"):
+        return model[:-1].transform(texts)
+
+
+def _calculate_manual_confidence(classifier, X_vec, predicted_classes):
     """
     Fallback method for 'Hard Voting' classifiers that don't support predict_proba().
-    It digs into the pipeline to get probability estimates from the underlying estimators.
+    It digs into the ensemble to get probability estimates from the underlying estimators,
+    reusing the already vectorized batch.
+    The estimators see the output of the whole feature pipeline (counts + TF-IDF), the features they
+    were trained on.
+    Returns the confidences and the path taken: "manual", or "default" if no estimate was available.
     """
     try:
-        vectorizer = model.steps[0][1]
-        classifier = model.steps[-1][1]
-
-        X_vec = vectorizer.transform([text])
+        rows = np.arange(len(predicted_classes))
 
         internal_probs = []
         if hasattr(classifier, 'estimators_'):
             for estimator in classifier.estimators_:
                 try:
-                    prob = estimator.predict_proba(X_vec)[0][predicted_class]
-                    internal_probs.append(prob)
+                    probs = estimator.predict_proba(X_vec)
+                    internal_probs.append(probs[rows, predicted_classes])
                 except AttributeError:
                     continue
 
         if internal_probs:
-            return np.mean(internal_probs)
+            return np.mean(internal_probs, axis=0), "manual"
 
     except Exception as e:
+        metrics.increment("errors", "manual_confidence", type(e).__name__)
         print(f"Warning: Could not calculate manual confidence: {e}")
 
-    return 1.0  # Default to 100% confidence if calculation fails
+    return np.ones(len(predicted_classes)), "default"  # Default to 100% confidence if calculation fails
+
+
+def _predict_with_confidence(model, texts):
+    """Vectorizes the texts once and returns the predicted classes and their confidences."""
+    # Compiled models (compiled_model.CompiledModel) do the whole computation themselves
+    if hasattr(model, "predict_with_confidence"):
+        with metrics.stage("compiled_predict"):
+            predictions, confidences = model.predict_with_confidence(texts)
+        metrics.increment("confidence_path", "compiled", amount=len(predictions))
+        return predictions, confidences
+
+    classifier = model.steps[-1][1]
+    X_vec = _vectorize(model, texts)
 
+    with metrics.stage("predict"):
+        predictions = np.asarray(classifier.predict(X_vec))
 
-def predict_bias(model, input_data):
+    if hasattr(classifier, "predict_proba"):
+        # Try the standard way (Soft Voting)
+        with metrics.stage("predict_proba"):
+            probs = classifier.predict_proba(X_vec)
+        confidences = probs[np.arange(len(predictions)), predictions]
+        metrics.increment("confidence_path", "predict_proba", amount=len(predictions))
+    else:
+        # Fallback to manual calculation (Hard Voting)
+        with metrics.stage("manual_confidence"):
+            confidences, path = _calculate_manual_confidence(classifier, X_vec, predictions)
+        metrics.increment("confidence_path", path, amount=len(predictions))
+
+    return predictions, confidences
+
+
+def score_texts(model, texts, preprocess=True):
     """
-    Main function to predict if text is Independent or Propaganda.
-    Handles both raw text and URLs.
+    Scores a list of texts (never treated as URLs) in a single vectorization pass.
+    With preprocess=True the texts go through the same spaCy cleaning as the training data;
+    pass False if the inputs are already preprocessed.
+    Returns one (label index, propaganda score 0.0 - 1.0) tuple per text.
     """
-    is_url = "http" in input_data
-    text_content = input_data
+    metrics.observe("batch_size", len(texts))
+    for text in texts:
+        metrics.observe("text_chars", len(text))
+
+    # 1. Clean the texts the same way as the training data
+    if preprocess:
+        # No on-disk preprocessing cache on the request path: it would be reopened for every batch and
+        # grow without bound; repeated inputs are already served by cache.PredictionCache
+        with metrics.stage("preprocess"):
+            texts = list(preprocess_texts(texts, n_process=1, cache_path=None))
+
+    # 2. Predict (0 or 1) and calculate confidence on one sparse matrix
+    predictions, confidences = _predict_with_confidence(model, texts)
+
+    # 3. Calculate "Propaganda Score" (0.0 - 1.0)
+    # If class is 1 (Propaganda), score is confidence.
+    # If class is 0 (Independent), score is 1 - confidence.
+    scores = []
+    for prediction_idx, confidence in zip(predictions, confidences):
+        prediction_idx = int(prediction_idx)
+        confidence = float(confidence)
+        scores.append((prediction_idx, confidence if prediction_idx == 1 else (1 - confidence)))
+
+    return scores
+
+
+def _count_results(results):
+    for result in results:
+        metrics.increment("results", result["status"])
+    return results
+
+
+def predict_bias_batch(model, inputs, preprocess=True, cache=None):
+    """
+    Predicts a list of texts and/or URLs in a single vectorization pass (see score_texts).
+    With a cache (cache.PredictionCache), known URLs are not downloaded again and texts
+    already scored by the same model are not scored again.
+
+    Returns one dict per input, in input order, with the keys:
+    'input', 'is_url', 'label' (class index or None), 'score' (propaganda score 0.0 - 1.0
+    or None), 'status' (one of the STATUS_* values) and 'error' (message or None).
+    """
+    results = []
+    texts = []
+    text_positions = []
 
     # 1. Get Text (if URL)
-    if is_url:
-        text_content = fetch_article_content(input_data)
+    for position, input_data in enumerate(inputs):
+        is_url = "http" in input_data
+        results.append({
+            "input": input_data,
+            "is_url": is_url,
+            "label": None,
+            "score": None,
+            "status": STATUS_OK,
+            "error": None
+        })
+
+        if not is_url:
+            text_content = input_data
+        elif cache is not None:
+            text_content = cache.get_text(input_data)
+        else:
+            text_content = fetch_article_content(input_data)
+
         if not text_content:
-            return "Error: Could not extract text from URL."
+            results[position]["status"] = STATUS_FETCH_ERROR
+            results[position]["error"] = "Could not extract text from URL."
+            continue
+
+        cached = cache.get_prediction(text_content, preprocess) if cache is not None else None
+        if cached is not None:
+            results[position]["label"], results[position]["score"] = cached
+            continue
+
+        texts.append(text_content)
+        text_positions.append(position)
+
+    if not texts:
+        return _count_results(results)
 
+    # 2. Score every text at once
     try:
-        # 2. Predict (0 or 1)
-        prediction_idx = model.predict([text_content])[0]
+        scores = score_texts(model, texts, preprocess)
+    except Exception as e:
+        for position in text_positions:
+            results[position]["status"] = STATUS_PREDICTION_ERROR
+            results[position]["error"] = str(e)
+        return _count_results(results)
 
-        # 3. Calculate Confidence (Probability)
-        confidence = 0.0
-        try:
-            # Try the standard way (Soft Voting)
-            probs = model.predict_proba([text_content])[0]
-            confidence = probs[prediction_idx]
-        except AttributeError:
-            # Fallback to manual calculation (Hard Voting)
-            confidence = _calculate_manual_confidence(model, text_content, prediction_idx)
+    for position, (prediction_idx, propaganda_score) in zip(text_positions, scores):
+        results[position]["label"] = prediction_idx
+        results[position]["score"] = propaganda_score
 
-        # 4. Calculate "Propaganda Score" (0.0 - 1.0)
-        # If class is 1 (Propaganda), score is confidence.
-        # If class is 0 (Independent), score is 1 - confidence.
-        propaganda_score = confidence if prediction_idx == 1 else (1 - confidence)
+    if cache is not None:
+        cache.put_predictions(texts, scores, preprocess)
 
-        # 5. Format Output
-        label = LABELS.get(prediction_idx, "Unknown")
-        score_percent = round(propaganda_score * 100, 2)
+    return _count_results(results)
 
-        # Add a warning if it's flagged as Propaganda but confidence is low (<50% essentially means the model is split)
-        # Note: In binary classification, if confidence for class 1 is < 0.5, it would usually be class 0.
-        # But depending on how confidence is calculated above, we might want this check.
-        result_msg = f"{label}, {score_percent}% chance for containing propagandistic rhetoric"
 
-        if label == "Propagandistic rhetoric" and propaganda_score < 0.5:
-            result_msg = f"Suspicious (Uncertain), {score_percent}% chance for containing propagandistic rhetoric"
+def format_result(result):
+    """Formats a single predict_bias_batch() result as a human-readable message."""
+    if result["status"] == STATUS_FETCH_ERROR:
+        return f"Error: {result['error']}"
+    if result["status"] == STATUS_PREDICTION_ERROR:
+        return f"Prediction Error: {result['error']}"
 
-        if is_url:
-            result_msg += f" | URL: {input_data}"
+    propaganda_score = result["score"]
+    label = LABELS.get(result["label"], "Unknown")
+    score_percent = round(propaganda_score * 100, 2)
 
-        return result_msg
+    # Add a warning if it's flagged as Propaganda but confidence is low (<50% essentially means the model is split)
+    # Note: In binary classification, if confidence for class 1 is < 0.5, it would usually be class 0.
+    # But depending on how confidence is calculated above, we might want this check.
+    result_msg = f"{label}, {score_percent}% chance for containing propagandistic rhetoric"
 
-    except Exception as e:
-        return f"Prediction Error: {e}"
\ No newline at end of file
+    if label == "Propagandistic rhetoric" and propaganda_score < 0.5:
+        result_msg = f"Suspicious (Uncertain), {score_percent}% chance for containing propagandistic rhetoric"
+
+    if result["is_url"]:
+        result_msg += f" | URL: {result['input']}"
+
+    return result_msg
+
+
+def predict_bias(model, input_data, cache=None):
+    """
+    Main function to predict if text is Independent or Propaganda.
+    Handles both raw text and URLs.
+    """
+    with metrics.trace(input=input_data[:200]):
+        return format_result(predict_bias_batch(model, [input_data], cache=cache)[0])
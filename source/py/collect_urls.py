@@ -1,8 +1,19 @@
-import feedparser
+import calendar
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+import requests
+
+from keyword_matcher import KeywordMatcher
+from url_store import DEFAULT_STORE_PATH, UrlStore, ends_with_newline
 
 # --- CONFIGURATION ---
 
+MAX_FEED_WORKERS = 16  # Feeds polled in parallel
+FEED_TIMEOUT = 15      # Seconds (connect and read), so one hanging feed can't stall the whole cycle
+
 # List of independent news sources
 FEEDS_INDEPENDENT = [
     "https://telex.hu/rss",
@@ -71,14 +82,51 @@ KEYWORDS = [
 
 # --- FUNCTIONS ---
 
-def fetch_urls_from_feed(feed_url: str, keywords: list = None, limit: int = None) -> set:
-    """Parses a single feed and returns a set of matching URLs."""
-    urls = set()
+def _entry_timestamp(entry) -> float:
+    """Returns the publish (or update) time of a feed entry as a UTC timestamp, or None if unknown."""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed) if parsed else None
+
+
+def _as_matcher(keywords) -> KeywordMatcher:
+    """Accepts a keyword list or an already compiled KeywordMatcher."""
+    if keywords is None or isinstance(keywords, KeywordMatcher):
+        return keywords
+    return KeywordMatcher(keywords)
+
+
+def poll_feed(feed_url: str, keywords=None, limit: int = None, feed_state: dict = None) -> tuple:
+    """
+    Parses a single feed with a conditional GET and returns ({url: matched keywords}, new feed state).
+    keywords may be a list or a compiled KeywordMatcher.
+    feed_state holds the 'etag', 'modified' and 'last_seen' values of the previous poll;
+    unchanged feeds come back as 304 and entries older than 'last_seen' are skipped.
+    """
+    matcher = _as_matcher(keywords)
+    feed_state = feed_state or {}
+    urls = {}
+    headers = {}
+    if feed_state.get('etag'):
+        headers['If-None-Match'] = feed_state['etag']
+    if feed_state.get('modified'):
+        headers['If-Modified-Since'] = feed_state['modified']
+
     try:
-        feed = feedparser.parse(feed_url)
+        # feedparser's own download (urllib) has no timeout, so the feed is fetched with requests
+        response = requests.get(feed_url, headers=headers, timeout=FEED_TIMEOUT)
+
+        # Nothing changed since the last poll
+        if response.status_code == 304:
+            return urls, feed_state
+
+        response.raise_for_status()
+        feed = feedparser.parse(response.content, response_headers=dict(response.headers))
     except Exception as e:
         print(f"Error reading feed ({feed_url}): {e}")
-        return urls
+        return urls, feed_state
+
+    last_seen = feed_state.get('last_seen')
+    newest_seen = last_seen
 
     count = 0
     for entry in feed.entries:
@@ -90,33 +138,80 @@ def fetch_urls_from_feed(feed_url: str, keywords: list = None, limit: int = None
         if not url:
             continue
 
+        published = _entry_timestamp(entry)
+        if published is not None:
+            if last_seen is not None and published < last_seen:
+                continue  # Skip if already seen in an earlier poll
+            newest_seen = published if newest_seen is None else max(newest_seen, published)
+
         # If keywords are provided, filter the entries
-        if keywords:
-            text = (entry.get('title', '') + " " + entry.get('summary', '')).lower()
-            if not any(k.lower() in text for k in keywords):
+        matched = ()
+        if matcher:
+            matched = matcher.find(entry.get('title', '') + " " + entry.get('summary', ''))
+            if not matched:
                 continue  # Skip if no keyword match
 
-        urls.add(url)
+        urls[url] = tuple(sorted(matched))
         count += 1
 
-    return urls
+    new_state = {
+        'etag': response.headers.get('ETag', feed_state.get('etag')),
+        'modified': response.headers.get('Last-Modified', feed_state.get('modified')),
+        'last_seen': newest_seen
+    }
+    return urls, new_state
 
 
-def load_existing_urls(filepath: str) -> set:
-    """Reads existing URLs from the file to prevent duplicates."""
-    existing = set()
+def fetch_urls_from_feed(feed_url: str, keywords=None, limit: int = None) -> set:
+    """Parses a single feed and returns a set of matching URLs."""
+    urls, _ = poll_feed(feed_url, keywords, limit)
+    return set(urls)
+
+
+def poll_feeds(feed_list: list, keywords=None, feed_states: dict = None,
+               max_workers: int = MAX_FEED_WORKERS) -> list:
+    """
+    Polls all feeds concurrently.
+    Returns a list of (feed_url, {url: matched keywords}, new feed state) tuples in the order of feed_list.
+    """
+    # Compile the keywords once for all feeds
+    matcher = _as_matcher(keywords)
+    feed_states = feed_states or {}
+
+    def poll(feed_url):
+        return poll_feed(feed_url, matcher, feed_state=feed_states.get(feed_url))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(poll, feed_list)
+        return [(feed_url, urls, state) for feed_url, (urls, state) in zip(feed_list, results)]
+
+
+def load_feed_state(filepath: str) -> dict:
+    """Reads the saved ETag / Last-Modified / last seen entry of every feed."""
     if os.path.exists(filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    existing.add(line.strip())
-    return existing
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read feed state ({e}). Polling every feed in full.")
+    return {}
 
 
-def collect_news(category_id: int, output_file: str, keywords: list = None, max_items: int = None):
+def save_feed_state(filepath: str, feed_states: dict):
+    """Writes the feed state atomically, so an interrupted run can't corrupt it."""
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(feed_states, f, indent=2)
+    os.replace(tmp_path, filepath)
+
+
+def collect_news(category_id: int, output_file: str, keywords=None, max_items: int = None,
+                 state_file: str = None, store_path: str = DEFAULT_STORE_PATH):
     """
     Main logic controller.
     category_id: 0 for Independent, 1 for Government
+    state_file: where the conditional-GET state of the feeds is kept (default: next to output_file)
+    New URLs are appended to output_file and registered (with their matched keywords) in the URL store.
     """
 
     # 1. Select Source List
@@ -127,39 +222,54 @@ def collect_news(category_id: int, output_file: str, keywords: list = None, max_
         feed_list = FEEDS_GOV
         print(f"--- Collecting PRO-GOVERNMENT news (Target: {max_items if max_items else 'Unlimited'}) ---")
 
-    # 2. Load already saved URLs to avoid duplicates
-    saved_urls = load_existing_urls(output_file)
-    initial_count = len(saved_urls)
+    # 2. Open the URL store (duplicates are checked against its index, not by rereading the file)
+    store = UrlStore(store_path)
+    store.sync_file(output_file, category_id, complete=True)
     new_items_count = 0
 
-    # 3. Iterate through feeds
+    # 3. Poll all feeds in parallel (conditional GET against the saved state)
+    state_file = state_file or output_file + ".feedstate.json"
+    feed_states = load_feed_state(state_file)
+    poll_results = poll_feeds(feed_list, keywords, feed_states)
+
+    # 4. Save the new URLs (on a new line, even if the last one of the file has no newline)
+    needs_newline = not ends_with_newline(output_file)
     with open(output_file, 'a', encoding='utf-8') as f:
-        for feed_url in feed_list:
+        if needs_newline:
+            f.write("\n")
+        for feed_url, fetched_urls, new_state in poll_results:
             # Global limit check
             if max_items is not None and new_items_count >= max_items:
                 break
 
-            # Fetch URLs from current feed
-            fetched_urls = fetch_urls_from_feed(feed_url, keywords)
-
             current_feed_new = 0
-            for url in fetched_urls:
-                if url not in saved_urls:
+            for url, matched_keywords in fetched_urls.items():
+                # Stop if we hit the global limit mid-feed
+                if max_items is not None and new_items_count >= max_items:
+                    break
+
+                if store.add(url, category_id, matched_keywords):
                     f.write(url + "\n")
-                    saved_urls.add(url)  # Add to set
                     new_items_count += 1
                     current_feed_new += 1
-
-                    # Stop if we hit the global limit mid-feed
-                    if max_items is not None and new_items_count >= max_items:
-                        break
+            else:
+                # Only remember the feed state once all of its entries were consumed
+                feed_states[feed_url] = new_state
 
             if current_feed_new > 0:
                 print(f"Saved {current_feed_new} new articles from: {feed_url}")
 
+    # Our own appends are already in the store; this only moves the file offset forward
+    store.sync_file(output_file, category_id)
+    store.commit()
+    total_count = store.count(label=category_id)
+    store.close()
+
+    save_feed_state(state_file, feed_states)
+
     print("-" * 50)
     print(f"Finished. Total new items saved: {new_items_count}")
-    print(f"File '{output_file}' now contains {len(saved_urls)} unique URLs.")
+    print(f"The URL store now contains {total_count} unique URLs for this category.")
     print("-" * 50)
 
 
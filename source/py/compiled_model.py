@@ -0,0 +1,369 @@
+import argparse
+import json
+import re
+from collections import Counter
+
+import numpy as np
+
+# --- CONFIGURATION ---
+
+MODEL_PATH = '../../models/ensemble_pipeline_id1_0_89.joblib'
+COMPILED_PATH = '../../models/ensemble_pipeline_id1_0_89.compiled.npz'
+VERIFY_CSV = '../../data/preprocessed_articles_example.csv'
+
+FORMAT_VERSION = 1
+
+
+# --- EXPORT ---
+
+def _check_vectorizer(vectorizer):
+    """The compiled analyzer only reproduces the plain word n-gram CountVectorizer settings."""
+    unsupported = []
+    if getattr(vectorizer, "analyzer", None) != "word":
+        unsupported.append("analyzer")
+    for name in ("preprocessor", "tokenizer", "strip_accents"):
+        if getattr(vectorizer, name, None) is not None:
+            unsupported.append(name)
+    if unsupported:
+        raise ValueError(f"Unsupported vectorizer settings for compilation: {', '.join(unsupported)}")
+
+
+def _tfidf_params(pipeline) -> dict:
+    """Finds the TF-IDF weighting, either in a TfidfTransformer step or inside a TfidfVectorizer."""
+    middle = [step for _, step in pipeline.steps[1:-1]]
+    if len(middle) > 1:
+        raise ValueError("Only a vectorizer, an optional TF-IDF step and a classifier can be compiled.")
+
+    source = middle[0] if middle else pipeline.steps[0][1]
+    if not hasattr(source, "use_idf"):
+        return None
+
+    return {
+        "norm": source.norm,
+        "use_idf": bool(source.use_idf),
+        "sublinear_tf": bool(source.sublinear_tf),
+        "idf": np.asarray(source.idf_, dtype=np.float64) if source.use_idf else None
+    }
+
+
+def _is_logistic(estimator) -> bool:
+    """True for the linear models whose predict_proba is the sigmoid of the decision function."""
+    name = type(estimator).__name__
+    return name == "LogisticRegression" or (name == "SGDClassifier" and estimator.loss in ("log_loss", "log"))
+
+
+def _export_estimator(estimator, prefix: str, arrays: dict) -> dict:
+    """Flattens one fitted estimator into arrays (stored under prefix) and returns its metadata."""
+    if hasattr(estimator, "calibrated_classifiers_"):
+        # CalibratedClassifierCV around a linear model: one (weights, sigmoid) pair per CV fold
+        coefs, intercepts, slopes, offsets = [], [], [], []
+        for calibrated in estimator.calibrated_classifiers_:
+            base = getattr(calibrated, "estimator", None) or getattr(calibrated, "base_estimator")
+            if calibrated.method != "sigmoid" or not hasattr(base, "coef_"):
+                raise ValueError("Only sigmoid-calibrated linear models can be compiled.")
+            coefs.append(np.ravel(base.coef_))
+            intercepts.append(float(np.ravel(base.intercept_)[0]))
+            slopes.append(float(calibrated.calibrators[0].a_))
+            offsets.append(float(calibrated.calibrators[0].b_))
+
+        arrays[prefix + "coef"] = np.vstack(coefs).astype(np.float64)
+        arrays[prefix + "intercept"] = np.array(intercepts)
+        arrays[prefix + "a"] = np.array(slopes)
+        arrays[prefix + "b"] = np.array(offsets)
+        return {"kind": "calibrated_linear"}
+
+    if hasattr(estimator, "coef_") and hasattr(estimator, "intercept_"):
+        # Plain linear model (e.g. LinearSVC): dense weight vector + bias
+        has_proba = hasattr(estimator, "predict_proba")
+        if has_proba and not _is_logistic(estimator):
+            # e.g. SGDClassifier(loss='modified_huber'): its probability is not the sigmoid of the decision
+            raise ValueError(f"Only logistic linear models can be compiled with probabilities, "
+                             f"not {type(estimator).__name__}(loss={getattr(estimator, 'loss', None)!r}).")
+        arrays[prefix + "coef"] = np.ravel(estimator.coef_).astype(np.float64)
+        arrays[prefix + "intercept"] = np.array([float(np.ravel(estimator.intercept_)[0])])
+        return {"kind": "linear", "has_proba": has_proba}
+
+    if hasattr(estimator, "estimators_") and hasattr(estimator, "learning_rate"):
+        # Binary GradientBoostingClassifier: every regression tree in one set of contiguous arrays
+        stages = estimator.estimators_
+        if stages.shape[1] != 1:
+            raise ValueError("Only binary gradient boosting models can be compiled.")
+
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in stages[:, 0]:
+            structure = tree.tree_
+            is_leaf = structure.children_left == -1
+            roots.append(offset)
+            left.append(np.where(is_leaf, -1, structure.children_left + offset))
+            right.append(np.where(is_leaf, -1, structure.children_right + offset))
+            feature.append(structure.feature)
+            threshold.append(structure.threshold)
+            # Scaled like in sklearn's predict_stages: raw += learning_rate * leaf value
+            value.append(estimator.learning_rate * structure.value[:, 0, 0])
+            max_depth = max(max_depth, int(structure.max_depth))
+            offset += structure.node_count
+
+        n_features = estimator.n_features_in_
+        init_raw = float(estimator._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0])
+
+        arrays[prefix + "left"] = np.concatenate(left).astype(np.int32)
+        arrays[prefix + "right"] = np.concatenate(right).astype(np.int32)
+        arrays[prefix + "feature"] = np.concatenate(feature).astype(np.int32)
+        arrays[prefix + "threshold"] = np.concatenate(threshold).astype(np.float64)
+        arrays[prefix + "value"] = np.concatenate(value).astype(np.float64)
+        arrays[prefix + "roots"] = np.array(roots, dtype=np.int32)
+        return {"kind": "gradient_boosting", "max_depth": max_depth, "init_raw": init_raw}
+
+    raise ValueError(f"Unsupported estimator for compilation: {type(estimator).__name__}")
+
+
+def export_pipeline(pipeline, output_path: str = COMPILED_PATH) -> str:
+    """
+    Compiles a fitted vectorizer (+ TF-IDF) + classifier pipeline into a single .npz artifact:
+    the frozen vocabulary with its IDF weights, dense linear weight vectors and the boosted
+    trees flattened into contiguous arrays.
+    """
+    vectorizer = pipeline.steps[0][1]
+    classifier = pipeline.steps[-1][1]
+    _check_vectorizer(vectorizer)
+
+    arrays = {}
+
+    # 1. Vocabulary, ordered by feature index
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    arrays["vocabulary"] = np.array(terms, dtype=str)
+
+    tfidf = _tfidf_params(pipeline)
+    if tfidf is not None and tfidf["idf"] is not None:
+        arrays["idf"] = tfidf.pop("idf")
+    elif tfidf is not None:
+        tfidf.pop("idf")
+
+    stop_words = vectorizer.get_stop_words()
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "vectorizer": {
+            "lowercase": bool(vectorizer.lowercase),
+            "token_pattern": vectorizer.token_pattern,
+            "ngram_range": list(vectorizer.ngram_range),
+            "binary": bool(vectorizer.binary),
+            "stop_words": sorted(stop_words) if stop_words else []
+        },
+        "tfidf": tfidf
+    }
+
+    # 2. Classifier (a VotingClassifier or a single supported estimator)
+    if hasattr(classifier, "voting"):
+        estimators = classifier.estimators_
+        weights = None
+        if classifier.weights is not None:
+            weights = [float(weight) for (_, est), weight in zip(classifier.estimators, classifier.weights)
+                       if est != "drop"]
+        meta["voting"] = classifier.voting
+        meta["weights"] = weights
+        classes = classifier.le_.classes_
+    else:
+        estimators = [classifier]
+        meta["voting"] = "single"
+        meta["weights"] = None
+        classes = classifier.classes_
+
+    if len(classes) != 2:
+        raise ValueError("Only binary classifiers can be compiled.")
+    arrays["classes"] = np.asarray(classes)
+
+    meta["estimators"] = [_export_estimator(est, f"est{i}_", arrays) for i, est in enumerate(estimators)]
+    arrays["meta"] = np.array(json.dumps(meta, ensure_ascii=False))
+
+    np.savez(output_path, **arrays)
+    return output_path
+
+
+# --- SCORING ---
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class CompiledModel:
+    """
+    Standalone scorer for artifacts written by export_pipeline(). Needs NumPy only.
+    Produces the same predictions as the original pipeline (up to floating point rounding).
+    """
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            self._arrays = {name: data[name] for name in data.files}
+
+        self.meta = json.loads(str(self._arrays.pop("meta")))
+        if self.meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format: {self.meta['format_version']}")
+
+        vectorizer = self.meta["vectorizer"]
+        self.classes_ = self._arrays["classes"]
+        self._vocabulary = {term: index for index, term in enumerate(self._arrays["vocabulary"].tolist())}
+        self._n_features = len(self._vocabulary)
+        self._token_re = re.compile(vectorizer["token_pattern"])
+        self._stop_words = frozenset(vectorizer["stop_words"])
+        self._lowercase = vectorizer["lowercase"]
+        self._min_n, self._max_n = vectorizer["ngram_range"]
+        self._binary = vectorizer["binary"]
+        self._tfidf = self.meta["tfidf"]
+        self._idf = self._arrays.get("idf")
+
+    # 1. Vectorization
+
+    def _analyze(self, text: str) -> list:
+        """Same word n-grams as CountVectorizer's analyzer."""
+        if self._lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self._stop_words:
+            tokens = [token for token in tokens if token not in self._stop_words]
+
+        grams = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), min(self._max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts) -> np.ndarray:
+        """Returns the dense TF-IDF matrix of the texts."""
+        X = np.zeros((len(texts), self._n_features), dtype=np.float64)
+
+        for row, text in enumerate(texts):
+            counts = Counter()
+            for gram in self._analyze(text):
+                index = self._vocabulary.get(gram)
+                if index is not None:
+                    counts[index] += 1
+            if counts:
+                X[row, list(counts.keys())] = list(counts.values())
+
+        if self._binary:
+            X = (X > 0).astype(np.float64)
+
+        if self._tfidf is not None:
+            if self._tfidf["sublinear_tf"]:
+                nonzero = X > 0
+                X[nonzero] = np.log(X[nonzero]) + 1
+            if self._idf is not None:
+                X *= self._idf
+            if self._tfidf["norm"] == "l2":
+                norms = np.sqrt((X ** 2).sum(axis=1))
+            elif self._tfidf["norm"] == "l1":
+                norms = np.abs(X).sum(axis=1)
+            else:
+                norms = None
+            if norms is not None:
+                norms[norms == 0] = 1.0
+                X /= norms[:, None]
+
+        return X
+
+    # 2. Estimators (each returns encoded predictions and class probabilities, or None)
+
+    def _linear(self, prefix: str, X: np.ndarray, meta: dict):
+        decision = X @ self._arrays[prefix + "coef"] + self._arrays[prefix + "intercept"][0]
+        proba = None
+        if meta["has_proba"]:
+            # Binary logistic models: P(class 1) is the sigmoid of the decision function
+            positive = _expit(decision)
+            proba = np.column_stack([1.0 - positive, positive])
+        return (decision > 0).astype(int), proba
+
+    def _calibrated_linear(self, prefix: str, X: np.ndarray, meta: dict):
+        decision = X @ self._arrays[prefix + "coef"].T + self._arrays[prefix + "intercept"]
+        positive = _expit(-(self._arrays[prefix + "a"] * decision + self._arrays[prefix + "b"]))
+        proba = np.column_stack([(1.0 - positive).mean(axis=1), positive.mean(axis=1)])
+        return np.argmax(proba, axis=1), proba
+
+    def _gradient_boosting(self, prefix: str, X: np.ndarray, meta: dict):
+        left = self._arrays[prefix + "left"]
+        right = self._arrays[prefix + "right"]
+        feature = self._arrays[prefix + "feature"]
+        threshold = self._arrays[prefix + "threshold"]
+        roots = self._arrays[prefix + "roots"]
+
+        # Walk every (document, tree) pair at once, one tree level per step; trees compare float32 features
+        X32 = X.astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+        for _ in range(meta["max_depth"]):
+            is_leaf = left[nodes] == -1
+            go_left = X32[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(is_leaf, nodes, np.where(go_left, left[nodes], right[nodes]))
+
+        raw = meta["init_raw"] + self._arrays[prefix + "value"][nodes].sum(axis=1)
+        positive = _expit(raw)
+        return (raw >= 0).astype(int), np.column_stack([1.0 - positive, positive])
+
+    # 3. Voting
+
+    def predict_with_confidence(self, texts):
+        """Returns the predicted classes and the confidence of each prediction, like classifier.py does."""
+        X = self.transform(texts)
+        rows = np.arange(X.shape[0])
+
+        predictions, probas = [], []
+        for i, meta in enumerate(self.meta["estimators"]):
+            predicted, proba = getattr(self, "_" + meta["kind"])(f"est{i}_", X, meta)
+            predictions.append(predicted)
+            probas.append(proba)
+
+        voting = self.meta["voting"]
+        weights = self.meta["weights"] or [1.0] * len(predictions)
+
+        if voting == "soft":
+            average = np.average(np.stack(probas), axis=0, weights=weights)
+            encoded = np.argmax(average, axis=1)
+            confidences = average[rows, encoded]
+        else:
+            if voting == "single":
+                encoded = predictions[0]
+            else:
+                votes = np.zeros((X.shape[0], len(self.classes_)))
+                for predicted, weight in zip(predictions, weights):
+                    votes[rows, predicted] += weight
+                encoded = np.argmax(votes, axis=1)
+
+            # Hard voting has no predict_proba: average the estimators that have one
+            available = [proba[rows, encoded] for proba in probas if proba is not None]
+            confidences = np.mean(available, axis=0) if available else np.ones(X.shape[0])
+
+        return self.classes_[encoded], confidences
+
+    def predict(self, texts) -> np.ndarray:
+        return self.predict_with_confidence(texts)[0]
+
+
+def verify(pipeline, compiled: CompiledModel, texts: list) -> int:
+    """Returns the number of texts where the compiled model predicts differently than the pipeline."""
+    expected = pipeline.predict(texts)
+    actual = compiled.predict(texts)
+    return int(np.sum(np.asarray(expected) != actual))
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    import csv
+    from joblib import load
+
+    parser = argparse.ArgumentParser(description="Compile a fitted pipeline into a standalone scoring artifact.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=COMPILED_PATH)
+    parser.add_argument("--verify-csv", default=VERIFY_CSV, help="CSV with a 'cleaned_text' column to compare on.")
+    args = parser.parse_args()
+
+    pipeline = load(args.model)
+    export_pipeline(pipeline, args.output)
+    print(f"Compiled model saved to {args.output}")
+
+    with open(args.verify_csv, encoding="utf-8-sig", newline="") as f:
+        sample = [row["cleaned_text"] for row in csv.DictReader(f)]
+    mismatches = verify(pipeline, CompiledModel(args.output), sample)
+    print(f"Verification: {len(sample) - mismatches}/{len(sample)} predictions match the original pipeline.")
@@ -0,0 +1,164 @@
+import datetime
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- CONFIGURATION ---
+
+ARTICLES_DIR = "../../data/articles"
+PREPROCESSED_DIR = "../../data/preprocessed_articles"
+
+# Old CSV files, migrated automatically when the corpus doesn't exist yet
+LEGACY_ARTICLES_CSV = "../../data/articles_example.csv"
+LEGACY_PREPROCESSED_CSV = "../../data/preprocessed_articles_example.csv"
+
+PARTITION_COLS = ["label", "collected"]
+PARTITIONING = ds.partitioning(pa.schema([("label", pa.int32()), ("collected", pa.string())]), flavor="hive")
+
+# Every write uses one of these fixed schemas; with inferred types, a batch where a column
+# is entirely empty would be written as 'null' and make the whole dataset unreadable
+ARTICLES_SCHEMA = pa.schema([("url", pa.string()), ("title", pa.string()), ("text", pa.string()),
+                             ("label", pa.int32()), ("collected", pa.string())])
+PREPROCESSED_SCHEMA = pa.schema([("url", pa.string()), ("cleaned_text", pa.string()),
+                                 ("label", pa.int32()), ("collected", pa.string())])
+MIGRATION_CHUNK_SIZE = 10000
+
+
+# --- FUNCTIONS ---
+
+def corpus_exists(root: str) -> bool:
+    """True if the corpus directory holds at least one row group file."""
+    if not os.path.isdir(root):
+        return False
+    return any(name.endswith(".parquet") for _, _, files in os.walk(root) for name in files)
+
+
+def schema_for(columns) -> pa.Schema:
+    """The fixed schema of a corpus: preprocessed if the rows have 'cleaned_text', raw articles otherwise."""
+    return PREPROCESSED_SCHEMA if "cleaned_text" in columns else ARTICLES_SCHEMA
+
+
+def append_rows(rows, root: str, collected: str = None) -> int:
+    """
+    Appends rows (list of dicts or DataFrame, with at least a 'label' column) to the corpus.
+    Every call writes new Parquet files under label=<label>/collected=<YYYY-MM-DD>/, existing files are never touched.
+    Columns are cast to the corpus schema (ARTICLES_SCHEMA or PREPROCESSED_SCHEMA); others are dropped.
+    Returns the number of rows written.
+    """
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return 0
+
+    schema = schema_for(df.columns)
+    df["label"] = df["label"].astype(int)
+    df["collected"] = collected or datetime.date.today().isoformat()
+    df = df.reindex(columns=schema.names)
+
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root,
+        partition_cols=PARTITION_COLS,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    return len(df)
+
+
+def _partition_filters(labels: list = None, since: str = None, until: str = None) -> list:
+    filters = []
+    if labels is not None:
+        filters.append(("label", "in", [int(label) for label in labels]))
+    if since is not None:
+        filters.append(("collected", ">=", since))
+    if until is not None:
+        filters.append(("collected", "<=", until))
+    return filters or None
+
+
+def read_corpus(root: str, columns: list = None, labels: list = None, since: str = None,
+                until: str = None) -> pa.Table:
+    """
+    Reads the corpus memory-mapped, loading only the requested columns
+    (e.g. ['url'] or ['cleaned_text', 'label']) of the requested partitions.
+    labels: only these labels; since / until: collection dates (YYYY-MM-DD, inclusive).
+    """
+    if not corpus_exists(root):
+        raise FileNotFoundError(f"No corpus found at: {root}")
+
+    return pq.read_table(
+        root,
+        columns=columns,
+        filters=_partition_filters(labels, since, until),
+        partitioning=PARTITIONING,
+        memory_map=True
+    )
+
+
+def read_urls(root: str, labels: list = None) -> set:
+    """Returns the set of URLs in the corpus, reading nothing but the 'url' column."""
+    if not corpus_exists(root):
+        return set()
+    return set(read_corpus(root, columns=["url"], labels=labels).column("url").to_pylist())
+
+
+def list_files(root: str, labels: list = None) -> list:
+    """Returns the row group files of the corpus (relative to root), optionally only of the given labels."""
+    if not corpus_exists(root):
+        return []
+
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    files = [os.path.relpath(path, root) for path in dataset.files]
+    if labels is not None:
+        wanted = {f"label={int(label)}" for label in labels}
+        files = [path for path in files if path.split(os.sep)[0] in wanted]
+    return sorted(files)
+
+
+def iter_batches(root: str, columns: list, files: list = None, batch_size: int = 10000):
+    """
+    Streams the corpus as pyarrow RecordBatches of at most batch_size rows, reading only the given columns.
+    files: restrict the scan to these files (as returned by list_files).
+    """
+    if files is not None:
+        source = [os.path.join(root, path) for path in files]
+        dataset = ds.dataset(source, format="parquet", partitioning=PARTITIONING, partition_base_dir=root)
+    else:
+        dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+
+    yield from dataset.to_batches(columns=columns, batch_size=batch_size)
+
+
+def migrate_csv(csv_file: str, root: str, collected: str = None, chunksize: int = MIGRATION_CHUNK_SIZE) -> int:
+    """
+    Copies an old articles CSV into a corpus directory in chunks (the CSV is left untouched).
+    The rows are dated by the modification time of the CSV unless collected is given.
+    URLs already in the corpus are skipped, so running it again adds nothing.
+    """
+    if not os.path.exists(csv_file):
+        print(f"Error: CSV file not found: {csv_file}")
+        return 0
+
+    collected = collected or datetime.date.fromtimestamp(os.path.getmtime(csv_file)).isoformat()
+    seen_urls = read_urls(root)
+
+    migrated = 0
+    for chunk in pd.read_csv(csv_file, encoding="utf-8-sig", chunksize=chunksize):
+        chunk = chunk[~chunk["url"].isin(seen_urls)].drop_duplicates(subset=["url"])
+        seen_urls.update(chunk["url"])
+        migrated += append_rows(chunk, root, collected)
+
+    print(f"Migrated {migrated} rows from {csv_file} to {root}.")
+    return migrated
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    # One-off migration of the CSV files into the Parquet corpus
+    migrate_csv(LEGACY_ARTICLES_CSV, ARTICLES_DIR)
+    migrate_csv(LEGACY_PREPROCESSED_CSV, PREPROCESSED_DIR)
@@ -0,0 +1,197 @@
+import codecs
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+
+from extractors import extract_article
+
+# --- CONFIGURATION ---
+
+MAX_WORKERS = 16          # Global concurrency limit
+MAX_PER_HOST = 2          # Concurrent requests allowed against a single domain
+TIMEOUT = 15              # Seconds, used for both connect and read
+MAX_RETRIES = 3           # Retries after the first attempt for transient errors
+BACKOFF_BASE = 1.0        # Seconds, doubled on every retry
+MAX_BACKOFF = 60.0        # Seconds; caps Retry-After too, so one server can't park a worker for hours
+
+# Status codes worth retrying; everything else (e.g. 403, 404) fails immediately
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_BYTES = 4096   # The charset declaration has to be near the top of the document
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+}
+
+
+# --- FUNCTIONS ---
+
+class DownloadError(Exception):
+    """Raised when a URL could not be downloaded. Keeps the HTTP status code (if any)."""
+
+    def __init__(self, url: str, message: str, status_code: int = None):
+        self.url = url
+        self.status_code = status_code
+        if status_code is not None:
+            message = f"{status_code} {message}"
+        super().__init__(message)
+
+
+class HostLimiter:
+    """Hands out one semaphore per host, so a single domain can't take all the workers."""
+
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def get(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._semaphores[host]
+
+
+# Used by fetch_html calls that come without their own limiter (classifier, server)
+_default_limiter = HostLimiter(MAX_PER_HOST)
+
+
+_thread_local = threading.local()
+
+
+def _get_session() -> requests.Session:
+    """requests.Session is not thread-safe, so every worker thread gets its own."""
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = requests.Session()
+        _thread_local.session.headers.update(HEADERS)
+    return _thread_local.session
+
+
+def _backoff_delay(attempt: int, backoff: float, retry_after: str = None) -> float:
+    """Exponential backoff with jitter. Honors a numeric Retry-After header, up to MAX_BACKOFF."""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return min(backoff * (2 ** attempt) + random.uniform(0, backoff), MAX_BACKOFF)
+
+
+def _declared_charset(content: bytes) -> str:
+    """The charset named in a <meta> tag of the page, or None if there is none (or Python doesn't know it)."""
+    match = META_CHARSET_RE.search(content[:META_CHARSET_BYTES])
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def decode_html(response: requests.Response) -> str:
+    """
+    Decodes an HTML response. requests assumes ISO-8859-1 for text/* without a charset in the
+    Content-Type header, which garbles Hungarian pages, so then the <meta> charset
+    (or the detected encoding) is used instead.
+    """
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = _declared_charset(response.content) or response.apparent_encoding
+    return response.text
+
+
+def fetch_html(url: str, limiter: HostLimiter = None, timeout: float = TIMEOUT,
+               max_retries: int = MAX_RETRIES, backoff: float = BACKOFF_BASE) -> str:
+    """
+    Downloads a single page, retrying transient errors with exponential backoff.
+    Without a limiter, the per-host limit is shared with every other single-page download of the process.
+    """
+    session = _get_session()
+    limiter = limiter or _default_limiter
+
+    for attempt in range(max_retries + 1):
+        last_attempt = attempt == max_retries
+        retry_after = None
+
+        try:
+            # Only the request itself counts against the per-host limit, not the backoff sleep
+            with limiter.get(url):
+                response = session.get(url, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_attempt:
+                raise DownloadError(url, f"Network error: {e}")
+        else:
+            if response.ok:
+                return decode_html(response)
+
+            if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                raise DownloadError(url, f"{response.reason} for url: {url}", response.status_code)
+            retry_after = response.headers.get("Retry-After")
+
+        time.sleep(_backoff_delay(attempt, backoff, retry_after))
+
+
+def parse_article(url: str, html: str) -> dict:
+    """Extracts the title and text of already downloaded HTML (per-domain selectors, newspaper as fallback)."""
+    return extract_article(url, html)
+
+
+def _interleave_by_host(urls: list) -> list:
+    """Orders URLs round-robin by host, so the workers spread across domains instead of queueing on one."""
+    by_host = defaultdict(deque)
+    for url in urls:
+        by_host[urlsplit(url).netloc.lower()].append(url)
+
+    ordered = []
+    queues = list(by_host.values())
+    while queues:
+        for queue in queues:
+            ordered.append(queue.popleft())
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+def _download_one(url: str, limiter: HostLimiter, timeout: float, max_retries: int, backoff: float) -> dict:
+    html = fetch_html(url, limiter, timeout=timeout, max_retries=max_retries, backoff=backoff)
+    return parse_article(url, html)
+
+
+def download_articles(urls: list, max_workers: int = MAX_WORKERS, max_per_host: int = MAX_PER_HOST,
+                      timeout: float = TIMEOUT, max_retries: int = MAX_RETRIES, backoff: float = BACKOFF_BASE):
+    """
+    Downloads and parses the given URLs concurrently.
+    Yields (url, article, error) tuples in completion order, where article is a dict
+    with 'title' and 'text' on success and error is the raised exception on failure.
+    Only a window of 2 * max_workers downloads is queued at a time, so closing the generator
+    (or an exception in the caller) stops the run after the downloads already in progress.
+    """
+    limiter = HostLimiter(max_per_host)
+    queued_urls = iter(_interleave_by_host(urls))
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit_next():
+        url = next(queued_urls, None)
+        if url is not None:
+            futures[executor.submit(_download_one, url, limiter, timeout, max_retries, backoff)] = url
+
+    try:
+        for _ in range(2 * max_workers):
+            submit_next()
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = futures.pop(future)
+                submit_next()
+
+                error = future.exception()
+                yield url, (future.result() if error is None else None), error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
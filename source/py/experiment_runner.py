@@ -0,0 +1,225 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.svm import LinearSVC
+
+# --- CONFIGURATION ---
+
+CACHE_DIR = '../../data/feature_cache'
+RESULTS_DIR = '../../experiments/results'
+
+# Stop word list of the notebooks (also drops source names like 'ripost', 'rss', 'copyright')
+HU_STOP_WORDS = [
+    "2010", "2020", "a", "abban", "ad", "adatvédelmi", "ahhoz", "ahogy",
+    "ahol", "ahogy", "aki", "akik", "akit", "akár", "akkor", "alá", "alatt", "által",
+    "általában", "amely", "amelyek", "amelyekben", "amelyeket", "amelyet", "amelynek",
+    "ami", "amíg", "amikor", "amit", "amolyan", "amúgy", "annak", "arra", "arról",
+    "át", "az", "azért", "azok", "azoknak", "azon", "azonban", "azt", "aztán",
+    "azután", "azzal", "ászf", "bár", "be", "bele", "belül", "benne", "cikk",
+    "cikkek", "cikkeket", "com", "copyright", "csak", "de", "e", "ebben", "eddig",
+    "egész", "egy", "egyéb", "egyes", "egyetlen", "egyik", "egyre", "ehhez", "ekkor",
+    "el", "elég", "ellen", "elő", "először", "előtt", "első", "ember", "emilyen",
+    "én", "ennek", "éppen", "erre", "es", "esetleg", "és", "evvel", "ez", "ezek",
+    "ezen", "ezért", "ezt", "ezzel", "fel", "feladva", "felé", "felett", "fel",
+    "főleg", "ha", "hanem", "hát", "hello", "helló", "helyett", "hirtelen",
+    "hiszen", "hogy", "hogyan", "hol", "hozzászólás", "hozzászólások", "http",
+    "ide", "igen", "így", "igy", "ill", "ill.", "illetve", "ilyen", "ilyenkor",
+    "impresszum", "is", "ismét", "ison", "itt", "jó", "jobban", "jog fenntartva",
+    "jogi nyilatkozat", "jól", "kategória", "kell", "kellett", "keressünk",
+    "keresztül", "ki", "kis", "kívül", "komment", "köszönöm", "köszönjük", "köszi",
+    "közepette", "között", "közül", "külön", "le", "legalább", "legyen", "lehet",
+    "lehetett", "lenne", "lenni", "lesz", "lett", "maga", "magam", "magatokat",
+    "magát", "magunk", "magunkat", "magunkkal", "magunkra", "majd", "már", "más",
+    "másik", "meg", "még", "mellett", "mely", "melyek", "mert", "mi", "miért",
+    "míg", "mikor", "milyen", "mind", "minden", "mindenki", "mindenkinek",
+    "mindenkit", "mindent", "mindig", "mindneki", "mint", "mintha", "mit",
+    "mivel", "most", "nagy", "nagyobb", "nagyon", "ne", "néha", "néhány",
+    "nekem", "neki", "nélkül", "nem", "nincs", "ő", "oda", "ők", "õk", "őket",
+    "oka", "olyan", "ön", "os", "össze", "ott", "pedig", "persze", "pici",
+    "picivel", "pont", "rá", "rám", "rajtam", "ripost", "rólam", "rólunk", "rss",
+    "s", "saját", "sajnos", "sem", "semmi", "soha", "sok", "sokat", "sokkal",
+    "száma", "számára", "szemben", "szerint", "szerintem", "szeretettel",
+    "szerző", "szét", "szia", "sziasztok", "szinte", "szó", "talán", "te",
+    "tehát", "teljes", "ti", "több", "tőle", "tőlem", "tőletek", "tőlük",
+    "tőlünk", "tovább", "továbbá", "üdv", "úgy", "ugyanis", "új", "újabb",
+    "újra", "után", "utána", "utolsó", "vagy", "vagyis", "vagyok", "valaki",
+    "valami", "valamint", "valamit", "valaminek", "valamiért", "való", "van",
+    "vannak", "vele", "velem", "veletek", "velük", "vissza", "viszont", "volna",
+    "volt", "voltak", "voltam", "voltunk", "www"
+]
+
+# Same settings as the notebooks
+VECTORIZER_CONFIG = {
+    "ngram_range": [1, 2],
+    "token_pattern": r'\b\w+\b',
+    "min_df": 1,
+    "max_df": 0.9,
+    "max_features": 2000,
+    "stop_words": HU_STOP_WORDS,
+    "sublinear_tf": True
+}
+TEST_SIZE = 0.15
+N_SPLITS = 5
+RANDOM_STATE = 42
+
+GRIDS = {
+    "linear_svc": ("C", [10 ** l for l in range(-7, 5)]),
+    "random_forest": ("n_estimators", list(range(50, 501, 50)))
+}
+
+# Filled once per worker process by _init_worker
+_X = None
+_y = None
+_folds = None
+
+
+# --- FEATURE CACHE ---
+
+def cache_key(texts, labels, config: dict) -> str:
+    """Hash of the corpus (texts + labels) and the vectorizer configuration."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+    for text, label in zip(texts, labels):
+        digest.update(f"{label}\t".encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+MATRIX_PARTS = ("data", "indices", "indptr", "shape", "labels")
+
+
+def build_features(texts, labels, config: dict = VECTORIZER_CONFIG, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Returns the cache directory of the corpus: the CSR arrays of the TF-IDF matrix and the labels
+    as plain .npy files, vectorizing only if this corpus + configuration is not cached yet.
+    """
+    key = cache_key(texts, labels, config)
+    matrix_dir = os.path.join(cache_dir, key)
+
+    if all(os.path.exists(os.path.join(matrix_dir, f"{part}.npy")) for part in MATRIX_PARTS):
+        print(f"Using cached features: {matrix_dir}")
+        return matrix_dir
+
+    print("Vectorizing the corpus...")
+    vectorizer = CountVectorizer(ngram_range=tuple(config["ngram_range"]), token_pattern=config["token_pattern"],
+                                 min_df=config["min_df"], max_df=config["max_df"],
+                                 max_features=config["max_features"], stop_words=config["stop_words"])
+    tfidf = TfidfTransformer(sublinear_tf=config["sublinear_tf"])
+    X = tfidf.fit_transform(vectorizer.fit_transform(texts))
+
+    # Plain .npy files (not .npz) can be memory-mapped, so the workers share one copy through the page cache
+    X = X.tocsr()
+    arrays = {"data": X.data, "indices": X.indices, "indptr": X.indptr, "shape": np.asarray(X.shape),
+              "labels": np.asarray(labels, dtype=int)}
+    os.makedirs(matrix_dir, exist_ok=True)
+    for part in MATRIX_PARTS:
+        np.save(os.path.join(matrix_dir, f"{part}.npy"), arrays[part])
+    return matrix_dir
+
+
+# --- WORKERS ---
+
+def _init_worker(matrix_dir: str):
+    """Maps the cached matrix once per worker process; tasks only carry grid point and fold number."""
+    global _X, _y, _folds
+    arrays = {part: np.load(os.path.join(matrix_dir, f"{part}.npy"), mmap_mode="r") for part in MATRIX_PARTS}
+    _X = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                           shape=tuple(int(n) for n in arrays["shape"]), copy=False)
+    _y = np.asarray(arrays["labels"])
+
+    # Same split as the notebooks: a fixed test set, then stratified folds on the rest
+    indices = np.arange(len(_y))
+    train_full, _ = train_test_split(indices, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=_y)
+    skf = StratifiedKFold(n_splits=N_SPLITS, shuffle=True, random_state=RANDOM_STATE)
+    _folds = [(train_full[train], train_full[valid]) for train, valid in skf.split(train_full, _y[train_full])]
+
+
+def _make_model(model_name: str, value):
+    if model_name == "linear_svc":
+        return LinearSVC(random_state=RANDOM_STATE, max_iter=20000, class_weight="balanced", C=value, dual="auto")
+    if model_name == "random_forest":
+        return RandomForestClassifier(n_estimators=value, random_state=RANDOM_STATE, class_weight="balanced",
+                                      min_samples_leaf=5, min_samples_split=10, max_features='sqrt', n_jobs=1)
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+def _run_task(task: tuple) -> dict:
+    model_name, param_name, value, fold = task
+    train_idx, valid_idx = _folds[fold]
+
+    start = time.perf_counter()
+    model = _make_model(model_name, value)
+    model.fit(_X[train_idx], _y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    return {
+        "model": model_name,
+        "param": param_name,
+        "value": value,
+        "fold": fold + 1,
+        "train_f1": f1_score(_y[train_idx], model.predict(_X[train_idx]), pos_label=1),
+        "valid_f1": f1_score(_y[valid_idx], model.predict(_X[valid_idx]), pos_label=1),
+        "fit_seconds": round(fit_seconds, 3)
+    }
+
+
+# --- RUNNER ---
+
+def run_sweeps(texts, labels, models: list = None, max_workers: int = None, results_dir: str = RESULTS_DIR,
+               cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """
+    Runs every grid point x fold of the selected sweeps in parallel and writes the results table
+    (one row per fit, plus the per-value fold averages) to results_dir.
+    """
+    matrix_dir = build_features(texts, labels, cache_dir=cache_dir)
+
+    tasks = [
+        (model_name, GRIDS[model_name][0], value, fold)
+        for model_name in (models or list(GRIDS))
+        for value in GRIDS[model_name][1]
+        for fold in range(N_SPLITS)
+    ]
+    print(f"Running {len(tasks)} fits...")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(matrix_dir,)) as executor:
+        rows = list(executor.map(_run_task, tasks))
+
+    results = pd.DataFrame(rows)
+    # C and n_estimators share a column; object dtype keeps the integers from becoming floats
+    results["value"] = pd.Series([row["value"] for row in rows], dtype=object)
+    summary = (results.groupby(["model", "param", "value"], as_index=False)[["train_f1", "valid_f1", "fit_seconds"]]
+               .mean())
+
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    results.to_csv(os.path.join(results_dir, f"sweep_{stamp}_folds.csv"), index=False)
+    summary.to_csv(os.path.join(results_dir, f"sweep_{stamp}_summary.csv"), index=False)
+    print(f"Results saved to {results_dir}.")
+    return summary
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    from preprocessing import get_training_data
+
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweeps on cached feature matrices.")
+    parser.add_argument("--models", nargs="+", choices=list(GRIDS), default=list(GRIDS))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    x, y = get_training_data()
+    print(run_sweeps(x.tolist(), y.tolist(), args.models, args.workers).to_string(index=False))
@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+from lxml import etree, html as lxml_html
+from lxml.cssselect import CSSSelector
+
+import metrics
+
+# --- CONFIGURATION ---
+
+FIXTURES_DIR = "../../data/html_fixtures"
+
+MIN_TEXT_CHARS = 200   # A shorter body means the selector missed, so newspaper gets the page instead
+
+# Most of the sources run on WordPress and share its markup
+WORDPRESS = {"title": ["h1.entry-title"], "body": ["div.entry-content > p"]}
+
+# Candidate per-domain selectors (CSS, tried in order) for the sites in collect_urls.FEEDS_INDEPENDENT / FEEDS_GOV.
+# Only selectors scoped to the article container: generic ones ("article p", a bare "h1") also match
+# headers, teasers and share boxes, so a page they don't fit goes to newspaper instead.
+# The title falls back to the og:title meta tag. Subdomains match their parent domain.
+DOMAIN_SELECTORS = {
+    "telex.hu": {"title": [], "body": ["div.article-html-content p"]},
+    "444.hu": WORDPRESS,
+    "hvg.hu": {"title": [], "body": ["div.article-content p", "div.entry-content p"]},
+    "24.hu": WORDPRESS,
+    "nepszava.hu": WORDPRESS,
+    "magyarhang.org": WORDPRESS,
+    "merce.hu": WORDPRESS,
+    "g7.hu": WORDPRESS,
+    "media1.hu": WORDPRESS,
+    "qubit.hu": WORDPRESS,
+    "lakmusz.hu": WORDPRESS,
+    "valaszonline.hu": WORDPRESS,
+    "direkt36.hu": WORDPRESS,
+    "origo.hu": {"title": [], "body": ["div.article-content p"]},
+    "magyarnemzet.hu": {"title": [], "body": ["div.block-content p"]},
+    "mandiner.hu": {"title": [], "body": ["div.block-content p"]},
+    "888.hu": WORDPRESS,
+    "pestisracok.hu": WORDPRESS,
+    "vadhajtasok.hu": WORDPRESS,
+    "demokrata.hu": WORDPRESS,
+    "ripost.hu": {"title": [], "body": ["div.block-content p"]},
+    "metropol.hu": {"title": [], "body": ["div.block-content p"]},
+    "hirado.hu": WORDPRESS
+}
+
+# Domains whose selectors passed a real saved page in FIXTURES_DIR (python extractors.py lists the ones
+# ready to be added). Only these take the selector path in production; every other page goes to newspaper.
+ENABLED_DOMAINS = set()
+
+_TITLE_META = CSSSelector('meta[property="og:title"]')
+_compiled = {}
+
+
+# --- FUNCTIONS ---
+
+def _compile(domain: str) -> dict:
+    """Compiles the CSS selectors of a domain once per process."""
+    if domain not in _compiled:
+        config = DOMAIN_SELECTORS[domain]
+        _compiled[domain] = {part: [CSSSelector(selector) for selector in selectors]
+                             for part, selectors in config.items()}
+    return _compiled[domain]
+
+
+def domain_of(url: str) -> str:
+    """The configured domain a URL belongs to (www. and other subdomains included), or None."""
+    labels = (urlsplit(url).hostname or "").lower().split(".")
+    for start in range(len(labels) - 1):
+        candidate = ".".join(labels[start:])
+        if candidate in DOMAIN_SELECTORS:
+            return candidate
+    return None
+
+
+def _text_of(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def extract_with_selectors(url: str, html: str, enabled_only: bool = True):
+    """
+    Fast path: pulls the title and body of a known domain with its compiled selectors.
+    Returns {'title', 'text'}, or None if the domain is unknown (or not in ENABLED_DOMAINS,
+    unless enabled_only=False) or the selectors found no article.
+    """
+    domain = domain_of(url)
+    if domain is None or not html or (enabled_only and domain not in ENABLED_DOMAINS):
+        return None
+
+    selectors = _compile(domain)
+    try:
+        tree = lxml_html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        return None
+
+    for body_selector in selectors["body"]:
+        paragraphs = [_text_of(element) for element in body_selector(tree)]
+        text = "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+        if len(text) >= MIN_TEXT_CHARS:
+            break
+    else:
+        return None
+
+    title = ""
+    for title_selector in selectors.get("title", []):
+        found = title_selector(tree)
+        if found:
+            title = _text_of(found[0])
+            break
+    if not title:
+        meta = _TITLE_META(tree)
+        title = meta[0].get("content", "").strip() if meta else ""
+
+    return {"title": title, "text": text}
+
+
+def extract_with_newspaper(url: str, html: str) -> dict:
+    """Slow path: newspaper's general-purpose heuristics on already downloaded HTML."""
+    from newspaper import Article
+
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return {"title": article.title, "text": article.text}
+
+
+def extract_article(url: str, html: str) -> dict:
+    """Returns {'title', 'text'} of a page, using the selectors of an enabled domain when they work and newspaper otherwise."""
+    article = extract_with_selectors(url, html)
+    if article is not None:
+        metrics.increment("extractor", "selectors")
+        return article
+
+    metrics.increment("extractor", "newspaper")
+    return extract_with_newspaper(url, html)
+
+
+def _load_fixtures(fixtures_dir: str) -> list:
+    path = os.path.join(fixtures_dir, "fixtures.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fixture_errors(fixture: dict, html: str) -> list:
+    """The problems of the candidate selectors on a fixture page (an empty list if it passed)."""
+    fast = extract_with_selectors(fixture["url"], html, enabled_only=False)
+    path = "selectors" if fast is not None else "newspaper"
+    errors = []
+    if path != fixture["path"]:
+        errors.append(f"expected the {fixture['path']} path")
+    if fast is not None:
+        if fast["title"] != fixture["title"]:
+            errors.append(f"title {fast['title']!r}")
+        missing = [snippet for snippet in fixture["contains"] if snippet not in fast["text"]]
+        unwanted = [snippet for snippet in fixture.get("excludes", []) if snippet in fast["text"]]
+        if missing:
+            errors.append(f"missing {missing}")
+        if unwanted:
+            errors.append(f"boilerplate {unwanted}")
+    return errors
+
+
+def save_fixture(url: str, title: str, contains: list, excludes: list = None, fixtures_dir: str = FIXTURES_DIR) -> dict:
+    """
+    Downloads a live article page into fixtures_dir and records it in fixtures.json. The expected
+    title and text snippets come from the caller (read off the page in a browser), not from the
+    selectors, so the fixture checks them instead of repeating whatever they extract today.
+    """
+    from downloader import HostLimiter, fetch_html
+
+    domain = domain_of(url)
+    if domain is None:
+        raise ValueError(f"{url} is not in DOMAIN_SELECTORS")
+
+    html = fetch_html(url, HostLimiter(1))
+    file_name = f"{domain}.html"
+    with open(os.path.join(fixtures_dir, file_name), "w", encoding="utf-8") as f:
+        f.write(html)
+
+    fixture = {"file": file_name, "url": url, "path": "selectors", "title": title,
+               "contains": contains, "excludes": excludes or []}
+    # One real page per domain: a new capture replaces the domain's previous one
+    fixtures = [existing for existing in _load_fixtures(fixtures_dir) if existing["file"] != file_name]
+    fixtures.append(fixture)
+    with open(os.path.join(fixtures_dir, "fixtures.json"), "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return fixture
+
+
+def run_fixtures(fixtures_dir: str = FIXTURES_DIR, repeat: int = 20) -> bool:
+    """
+    Checks the candidate selectors against the saved pages listed in fixtures_dir/fixtures.json and
+    times them against newspaper on each page. Returns True if every fixture passed and every domain
+    in ENABLED_DOMAINS passed at least one real (not "synthetic") page.
+    """
+    fixtures = _load_fixtures(fixtures_dir)
+
+    passed = True
+    verified = set()  # Domains with a passing real page
+    print(f"{'fixture':<28} {'selectors':>12} {'newspaper':>12}  result")
+    for fixture in fixtures:
+        with open(os.path.join(fixtures_dir, fixture["file"]), "r", encoding="utf-8") as f:
+            html = f.read()
+
+        # 1. Correctness: the expected path was taken and the expected content was found
+        errors = _fixture_errors(fixture, html)
+        if not errors and fixture["path"] == "selectors" and not fixture.get("synthetic"):
+            verified.add(domain_of(fixture["url"]))
+
+        # 2. Timing: mean per page over repeat runs
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract_with_selectors(fixture["url"], html, enabled_only=False)
+        selector_ms = f"{(time.perf_counter() - start) / repeat * 1000:.2f} ms"
+
+        try:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                extract_with_newspaper(fixture["url"], html)
+            newspaper_ms = f"{(time.perf_counter() - start) / repeat * 1000:.2f} ms"
+        except ImportError:
+            newspaper_ms = "n/a"
+
+        passed = passed and not errors
+        result = "OK" if not errors else "FAIL: " + "; ".join(errors)
+        if fixture.get("synthetic"):
+            result += " (synthetic)"
+        print(f"{fixture['file']:<28} {selector_ms:>12} {newspaper_ms:>12}  {result}")
+
+    # 3. Coverage: a domain only takes the selector path once a real page of it passed
+    unverified = sorted(ENABLED_DOMAINS - verified)
+    if unverified:
+        print(f"\nFAIL: enabled without a passing real page: {', '.join(unverified)}")
+        passed = False
+    ready = sorted(verified - ENABLED_DOMAINS)
+    if ready:
+        print(f"\nVerified on a real page, can be added to ENABLED_DOMAINS: {', '.join(ready)}")
+    pending = sorted(set(DOMAIN_SELECTORS) - verified)
+    if pending:
+        print(f"\n{len(pending)} of {len(DOMAIN_SELECTORS)} domains have no passing real page and go to newspaper "
+              f"(capture one with python extractors.py --save URL ...): {', '.join(pending)}")
+
+    return passed
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the per-domain extractors on saved HTML pages.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--save", metavar="URL", help="Download a live article page as the fixture of its domain.")
+    parser.add_argument("--title", help="Expected title of the saved page (with --save).")
+    parser.add_argument("--contains", nargs="+", default=[], help="Text the body must contain (with --save).")
+    parser.add_argument("--excludes", nargs="+", default=[], help="Boilerplate the body must not contain (with --save).")
+    args = parser.parse_args()
+
+    if args.save:
+        if not args.title or not args.contains:
+            parser.error("--save needs the expected --title and at least one --contains snippet")
+        fixture = save_fixture(args.save, args.title, args.contains, args.excludes, args.fixtures)
+        print(f"Saved {args.save} as {fixture['file']}.")
+
+    raise SystemExit(0 if run_fixtures(args.fixtures, args.repeat) else 1)
@@ -0,0 +1,99 @@
+import re
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """Unicode case folding for Hungarian text (NFC first, so 'ő' typed with a combining accent matches too)."""
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def _trie_pattern(words: list) -> str:
+    """
+    Builds a regex from a character trie of the words, e.g. ['veszély', 'veszélyes'] -> 'veszély(?:es)?'.
+    Shared prefixes are matched only once, and the greedy optional groups prefer the longest keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True  # End of a keyword
+
+    def build(node):
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if is_end else group
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Matches a (possibly very large) keyword list against texts with one pre-compiled pattern.
+    The cost of a search depends on the text length, not on the number of keywords.
+    word_boundary=False keeps the substring semantics of the old `k in text` filter.
+    """
+
+    def __init__(self, keywords: list, word_boundary: bool = False):
+        self.word_boundary = word_boundary
+
+        # Normalized form -> keyword as it was given (duplicates collapse)
+        self._originals = {}
+        for keyword in keywords:
+            normalized = normalize_text(keyword.strip())
+            if normalized and normalized not in self._originals:
+                self._originals[normalized] = keyword
+
+        # Keywords that are prefixes of a longer keyword match wherever the longer one does
+        self._prefixes = {
+            keyword: [keyword[:i] for i in range(1, len(keyword))
+                      if keyword[:i] in self._originals and self._ends_at_boundary(keyword, i)]
+            for keyword in self._originals
+        }
+
+        self._search_pattern = None
+        self._find_pattern = None
+        if self._originals:
+            trie = _trie_pattern(list(self._originals))
+            if word_boundary:
+                self._search_pattern = re.compile(rf"(?<!\w)(?:{trie})(?!\w)")
+                # The lookahead makes finditer try every start position, so overlapping keywords are found too
+                self._find_pattern = re.compile(rf"(?<!\w)(?=({trie})(?!\w))")
+            else:
+                self._search_pattern = re.compile(trie)
+                self._find_pattern = re.compile(rf"(?=({trie}))")
+
+    def _ends_at_boundary(self, keyword: str, prefix_length: int) -> bool:
+        """In word boundary mode a prefix only counts if the longer keyword continues with a non-word character."""
+        if not self.word_boundary:
+            return True
+        next_char = keyword[prefix_length]
+        return not (next_char.isalnum() or next_char == "_")
+
+    def __len__(self):
+        return len(self._originals)
+
+    def matches(self, text: str) -> bool:
+        """Returns True if any keyword occurs in the text."""
+        if self._search_pattern is None:
+            return False
+        return self._search_pattern.search(normalize_text(text)) is not None
+
+    def find(self, text: str) -> set:
+        """Returns every keyword (as it was given) that occurs in the text."""
+        if self._find_pattern is None:
+            return set()
+
+        found = set()
+        for match in self._find_pattern.finditer(normalize_text(text)):
+            longest = match.group(1)
+            if longest not in found:
+                found.add(longest)
+                found.update(self._prefixes[longest])
+
+        return {self._originals[keyword] for keyword in found}
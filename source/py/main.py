@@ -1,25 +1,62 @@
-from classifier import predict_bias
-from joblib import load
+import argparse
+
+from metrics import StartupTimer
+
+# Started before the imports that pull in NumPy and joblib, so the report includes them
+startup = StartupTimer()
+with startup.phase("imports"):
+    import metrics
+    from cache import DEFAULT_CACHE_PATH, PredictionCache
+    from classifier import predict_bias
+    from model_loader import latest_version, load_model, versioned_path
 
 # --- CONFIGURATION ---
 MODEL_PATH = '../../models/ensemble_pipeline_id1_0_89.joblib'
+MODELS_DIR = '../../models'
+INCREMENTAL_MODEL_NAME = 'incremental_pipeline'  # Versions saved by train.py
 
 if __name__ == "__main__":
-    print(f"Loading model from {MODEL_PATH}...")
+    parser = argparse.ArgumentParser(description="Interactive propagandistic rhetoric classifier.")
+    parser.add_argument("--model", default=MODEL_PATH,
+                        help="Model path, or 'latest' for the newest version trained by train.py.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print how long the imports and the model load took.")
+    parser.add_argument("--trace-log", default=None,
+                        help="Append the per-stage timings of every prediction to this JSON-lines file.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH,
+                        help="SQLite file caching article texts and predictions between runs.")
+    parser.add_argument("--no-cache", action="store_true", help="Download and score every input again.")
+    args = parser.parse_args()
+
+    if args.model == "latest":
+        args.model = versioned_path(MODELS_DIR, INCREMENTAL_MODEL_NAME,
+                                    latest_version(MODELS_DIR, INCREMENTAL_MODEL_NAME))
+
+    metrics.set_trace_log(args.trace_log)
+
+    print(f"Loading model from {args.model}...")
     try:
-        loaded_model = load(MODEL_PATH)
+        with startup.phase("load model"):
+            loaded_model = load_model(args.model)
+        cache = PredictionCache(loaded_model, args.cache_path) if not args.no_cache else None
         print("Model loaded successfully. Type 'stop' to exit.")
 
+        if args.startup_report:
+            from preprocessing import get_nlp
+            with startup.phase("load spaCy model"):
+                get_nlp()
+            print(startup.report())
+
         while True:
             user_input = input("\nEnter text or URL: ")
             if user_input.strip().lower() == "stop":
                 break
 
-            result = predict_bias(loaded_model, user_input)
+            result = predict_bias(loaded_model, user_input, cache)
             print(result)
             print("-" * 30)
 
     except FileNotFoundError:
-        print(f"Critical Error: Model file not found at {MODEL_PATH}")
+        print(f"Critical Error: Model file not found at {args.model}")
     except Exception as e:
-        print(f"Critical Error: {e}")
\ No newline at end of file
+        print(f"Critical Error: {e}")
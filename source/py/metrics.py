@@ -0,0 +1,204 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(2 ** n for n in range(8, 24, 2))   # 256 B/chars ... 4 M
+
+
+# --- RECORDERS ---
+
+class NullRecorder:
+    """Default recorder: instrumentation costs two perf_counter() calls per stage and nothing else."""
+
+    def observe_stage(self, stage: str, seconds: float):
+        pass
+
+    def observe(self, metric: str, value: float):
+        pass
+
+    def increment(self, metric: str, *labels: str, amount: int = 1):
+        pass
+
+
+class PrometheusRecorder:
+    """Stage latency and size histograms plus event counters, exported in the Prometheus text format."""
+
+    def __init__(self):
+        from prometheus_client import CollectorRegistry, Counter, Histogram
+
+        self.registry = CollectorRegistry()
+        self._stage_seconds = Histogram("propaganda_stage_seconds", "Time spent in each scoring stage",
+                                        ["stage"], buckets=STAGE_BUCKETS, registry=self.registry)
+        self._histograms = {
+            "fetch_bytes": Histogram("propaganda_fetch_bytes", "Size of the downloaded HTML",
+                                     buckets=SIZE_BUCKETS, registry=self.registry),
+            "text_chars": Histogram("propaganda_text_chars", "Length of the scored texts before cleaning",
+                                    buckets=SIZE_BUCKETS, registry=self.registry),
+            "batch_size": Histogram("propaganda_batch_size", "Number of texts scored together",
+                                    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256), registry=self.registry)
+        }
+        self._counters = {
+            "confidence_path": Counter("propaganda_confidence_path", "Predictions by how their confidence was computed",
+                                       ["path"], registry=self.registry),
+            "errors": Counter("propaganda_errors", "Exceptions raised inside a stage, by stage and class",
+                              ["stage", "error"], registry=self.registry),
+            "results": Counter("propaganda_results", "Prediction results by status",
+                               ["status"], registry=self.registry),
+            "cache": Counter("propaganda_cache", "Cache lookups by outcome (see cache.py)",
+                             ["outcome"], registry=self.registry),
+            "extractor": Counter("propaganda_extractor", "Pages parsed by the per-domain selectors or newspaper",
+                                 ["path"], registry=self.registry)
+        }
+
+    def observe_stage(self, stage: str, seconds: float):
+        self._stage_seconds.labels(stage).observe(seconds)
+
+    def observe(self, metric: str, value: float):
+        self._histograms[metric].observe(value)
+
+    def increment(self, metric: str, *labels: str, amount: int = 1):
+        self._counters[metric].labels(*labels).inc(amount)
+
+    def export(self) -> tuple:
+        """Returns the (body, content type) of a /metrics response."""
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+class StartupTimer:
+    """Records the wall time and memory growth of named startup phases (imports, model load, ...)."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss_after = rss_mb()
+            rss_delta = rss_after - rss_before if rss_before is not None else None
+            self.phases.append((name, elapsed, rss_delta))
+
+    def report(self) -> str:
+        lines = ["--- Startup report ---"]
+        for name, elapsed, rss_delta in self.phases:
+            memory = f"{rss_delta:+8.1f} MB" if rss_delta is not None else "         n/a"
+            lines.append(f"{name:<30} {elapsed * 1000:9.1f} ms {memory}")
+
+        total = sum(elapsed for _, elapsed, _ in self.phases)
+        lines.append(f"{'Total':<30} {total * 1000:9.1f} ms")
+        rss = rss_mb()
+        if rss is not None:
+            lines.append(f"{'Resident memory':<30} {rss:9.1f} MB")
+        return "\n".join(lines)
+
+
+_recorder = NullRecorder()
+
+# Per-request trace (a list of events), shared with threads started via copy_context()
+_trace = contextvars.ContextVar("trace", default=None)
+_trace_log = None
+_trace_lock = threading.Lock()
+
+
+# --- FUNCTIONS ---
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB, or None if psutil is not installed."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def set_recorder(recorder):
+    """Replaces the active recorder (NullRecorder, PrometheusRecorder or anything with the same methods)."""
+    global _recorder
+    _recorder = recorder
+    return recorder
+
+
+def get_recorder():
+    return _recorder
+
+
+def enable_prometheus() -> PrometheusRecorder:
+    """Switches the scoring path to Prometheus metrics. Raises ImportError if prometheus_client is missing."""
+    if isinstance(_recorder, PrometheusRecorder):
+        return _recorder
+    return set_recorder(PrometheusRecorder())
+
+
+def set_trace_log(path: str):
+    """Appends one JSON line per traced request to path (None turns tracing off)."""
+    global _trace_log
+    _trace_log = path
+
+
+def _add_event(event: dict):
+    events = _trace.get()
+    if events is not None:
+        events.append(event)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a stage of the scoring path. Exceptions are counted by class and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _recorder.increment("errors", name, type(e).__name__)
+        _add_event({"stage": name, "error": type(e).__name__})
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _recorder.observe_stage(name, elapsed)
+        _add_event({"stage": name, "ms": round(elapsed * 1000, 3)})
+
+
+def observe(metric: str, value: float):
+    """Records a size (fetch_bytes, text_chars, batch_size)."""
+    _recorder.observe(metric, value)
+    _add_event({metric: value})
+
+
+def increment(metric: str, *labels: str, amount: int = 1):
+    """Counts an event (confidence_path, errors, results, cache, extractor), amount times at once."""
+    _recorder.increment(metric, *labels, amount=amount)
+    _add_event({metric: ":".join(labels), "n": amount} if amount != 1 else {metric: ":".join(labels)})
+
+
+@contextmanager
+def trace(**fields):
+    """
+    Collects every stage and event recorded inside the block (also from threads started with
+    contextvars.copy_context()) and writes them as one JSON line to the trace log, if one is set.
+    """
+    if _trace_log is None:
+        yield
+        return
+
+    events = []
+    token = _trace.set(events)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **fields,
+                  "total_ms": round((time.perf_counter() - start) * 1000, 3), "events": events}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _trace_lock:
+            with open(_trace_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
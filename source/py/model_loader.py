@@ -0,0 +1,33 @@
+import os
+import re
+
+import joblib
+
+# --- FUNCTIONS ---
+
+def load_model(model_path: str, mmap: bool = True):
+    """
+    Loads a joblib model. With mmap=True its arrays are memory-mapped read-only instead of
+    copied into every process (the shipped models are saved uncompressed, so they can be mapped as they are).
+    A .npz path is loaded as a compiled model (see compiled_model.py), the fastest to load.
+    """
+    if model_path.endswith(".npz"):
+        from compiled_model import CompiledModel
+        return CompiledModel(model_path)
+
+    # Compressed files can't be mapped; joblib then falls back to a regular load
+    return joblib.load(model_path, mmap_mode="r" if mmap else None)
+
+
+def versioned_path(models_dir: str, name: str, version: int) -> str:
+    """Path of a versioned model artifact, e.g. models/incremental_pipeline_v3.joblib."""
+    return os.path.join(models_dir, f"{name}_v{version}.joblib")
+
+
+def latest_version(models_dir: str, name: str) -> int:
+    """Highest saved version of a versioned model, or 0 if there is none yet."""
+    if not os.path.isdir(models_dir):
+        return 0
+    pattern = re.compile(rf"^{re.escape(name)}_v(\d+)\.joblib$")
+    versions = [int(match.group(1)) for match in map(pattern.match, os.listdir(models_dir)) if match]
+    return max(versions, default=0)
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import deque
+
+# --- CONFIGURATION ---
+
+SPACY_MODEL = "hu_core_news_lg"
+SPACY_FALLBACK_MODEL = "hu_core_news_md"
+DISABLED_PIPES = ["ner", "parser"]
+NUM_TOKEN = "NUM"
+
+BATCH_SIZE = 50
+N_PROCESS = max(1, (os.cpu_count() or 1) - 1)
+
+CACHE_PATH = "../../data/preprocess_cache.sqlite"
+CACHE_COMMIT_EVERY = 500
+SAVE_BATCH_SIZE = 1000  # Preprocessed rows buffered before appending them to the corpus
+
+
+_nlp = None
+
+
+# --- FUNCTIONS ---
+
+def get_nlp():
+    """Loads the spaCy model once per process (spaCy itself is only imported here)."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        try:
+            _nlp = spacy.load(SPACY_MODEL)
+        except OSError:
+            print("Can't found the big modell. Using the medium sized...")
+            _nlp = spacy.load(SPACY_FALLBACK_MODEL)
+    return _nlp
+
+
+def clean_doc(doc) -> str:
+    """Drops stop words and punctuation, replaces numbers with NUM and lemmatizes the rest."""
+    tokens = []
+    for token in doc:
+        if token.is_stop or token.is_punct:
+            continue
+        if token.like_num:
+            tokens.append(NUM_TOKEN)
+        else:
+            tokens.append(token.lemma_)
+
+    return " ".join(tokens)
+
+
+def config_fingerprint(nlp) -> str:
+    """Hash of everything that changes the output: spaCy model and version, stop words and cleaning settings."""
+    import spacy
+    config = {
+        "model": nlp.meta.get("name"),
+        "model_version": nlp.meta.get("version"),
+        "spacy_version": spacy.__version__,
+        "stop_words": sorted(nlp.Defaults.stop_words),
+        "disabled": DISABLED_PIPES,
+        "num_token": NUM_TOKEN
+    }
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def text_key(text: str, fingerprint: str) -> str:
+    """Cache key of a text: its content hash combined with the preprocessing configuration."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(fingerprint.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PreprocessCache:
+    """SQLite cache of cleaned texts, keyed by text_key()."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cleaned (key TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID")
+        self._uncommitted = 0
+
+    def get(self, key: str) -> str:
+        row = self.conn.execute("SELECT text FROM cleaned WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, cleaned_text: str):
+        self.conn.execute("INSERT OR REPLACE INTO cleaned (key, text) VALUES (?, ?)", (key, cleaned_text))
+        self._uncommitted += 1
+        if self._uncommitted >= CACHE_COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def preprocess_texts(texts, batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS, cache_path: str = CACHE_PATH):
+    """
+    Generator yielding the cleaned version of every text, in input order.
+    texts can be any iterable (it is consumed lazily). Texts found in the cache, or repeated
+    while their first copy is still being processed, are not sent through spaCy again.
+    cache_path=None disables the on-disk cache.
+    """
+    nlp = get_nlp()
+    fingerprint = config_fingerprint(nlp)
+    cache = PreprocessCache(cache_path) if cache_path else None
+
+    cached_values = deque()  # Cache hits waiting for their turn in the output
+    in_flight = {}           # key -> number of repeats waiting for the same result
+    repeat_results = {}      # key -> [cleaned text, repeats still to be emitted]
+
+    def annotated():
+        # Everything goes through nlp.pipe (hits as empty placeholders), so the output keeps the input order
+        for text in texts:
+            key = text_key(text, fingerprint)
+            if key in in_flight:
+                in_flight[key] += 1
+                yield "", (key, "repeat")
+                continue
+
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                cached_values.append(cached)
+                yield "", (key, "cached")
+            else:
+                in_flight[key] = 0
+                yield text, (key, "new")
+
+    try:
+        for doc, (key, kind) in nlp.pipe(annotated(), as_tuples=True, batch_size=batch_size,
+                                         n_process=n_process, disable=DISABLED_PIPES):
+            if kind == "cached":
+                yield cached_values.popleft()
+
+            elif kind == "new":
+                cleaned = clean_doc(doc)
+                if cache:
+                    cache.put(key, cleaned)
+                repeats = in_flight.pop(key)
+                if repeats:
+                    repeat_results[key] = [cleaned, repeats]
+                yield cleaned
+
+            else:
+                entry = repeat_results[key]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del repeat_results[key]
+                yield entry[0]
+    finally:
+        if cache:
+            cache.close()
+
+
+def preprocess_one(text: str, cache_path: str = CACHE_PATH) -> str:
+    """Preprocessing a single string (in the current process)."""
+    return list(preprocess_texts([text], n_process=1, cache_path=cache_path))[0]
+
+
+def get_training_data(raw_dir: str = None, processed_dir: str = None, store_path: str = None,
+                      n_process: int = N_PROCESS):
+    """
+    Preprocesses the articles of the raw corpus that are not in the preprocessed corpus yet,
+    appends them to it, and returns (cleaned texts, labels) of the whole preprocessed corpus.
+    The directories default to corpus.ARTICLES_DIR / PREPROCESSED_DIR, the store to url_store.DEFAULT_STORE_PATH.
+    """
+    # Training-only dependencies, kept off the scoring import path
+    from corpus import ARTICLES_DIR, PREPROCESSED_DIR, append_rows, iter_batches, read_corpus, read_urls
+    from url_store import DEFAULT_STORE_PATH, PREPROCESSED, UrlStore
+
+    raw_dir = raw_dir or ARTICLES_DIR
+    processed_dir = processed_dir or PREPROCESSED_DIR
+    store_path = store_path or DEFAULT_STORE_PATH
+
+    def save_batch(store, rows):
+        append_rows(rows, processed_dir)
+        store.set_state([row["url"] for row in rows], PREPROCESSED)
+        store.commit()
+
+    # 1. Find the new articles from the 'url' columns alone
+    processed_urls = read_urls(processed_dir)
+    print(f"Loaded {len(processed_urls)} preprocessed articles.")
+    new_urls = read_urls(raw_dir) - processed_urls
+
+    if not new_urls:
+        print("There's no new article to preprocess. Working from the cache")
+    else:
+        print(f"Under preprocessing: {len(new_urls)} new articles...")
+
+        # 2. Stream only the new rows through spaCy; url and label wait in a queue for their cleaned text
+        waiting = deque()
+
+        def new_texts():
+            for record_batch in iter_batches(raw_dir, ['url', 'title', 'text', 'label']):
+                for row in record_batch.to_pylist():
+                    url = row['url']
+                    if url not in new_urls or row['title'] is None or row['text'] is None:
+                        continue
+                    new_urls.discard(url)  # Duplicated rows of the raw corpus are preprocessed once
+                    waiting.append((url, int(row['label'])))
+                    yield row['title'] + ": " + row['text']
+
+        # 3. Save them in batches
+        batch = []
+        with UrlStore(store_path) as store:
+            for cleaned_text in preprocess_texts(new_texts(), n_process=n_process):
+                url, label = waiting.popleft()
+                batch.append({"url": url, "cleaned_text": cleaned_text, "label": label})
+                if len(batch) >= SAVE_BATCH_SIZE:
+                    save_batch(store, batch)
+                    batch = []
+            if batch:
+                save_batch(store, batch)
+
+        print("New datas saved.")
+
+    # 4. Load only the columns needed for training
+    df_processed = read_corpus(processed_dir, columns=['cleaned_text', 'label']).to_pandas()
+    return df_processed['cleaned_text'], df_processed['label'].astype(int)
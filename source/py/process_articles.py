@@ -1,121 +1,129 @@
 import os
-import pandas as pd
-from newspaper import Article, ArticleException
 
+from corpus import ARTICLES_DIR, LEGACY_ARTICLES_CSV, append_rows, corpus_exists, migrate_csv, read_corpus
+from downloader import DownloadError, download_articles
+from url_store import DEFAULT_STORE_PATH, DISCOVERED, FAILED_403, FETCHED, UrlStore
 
+# --- CONFIGURATION ---
+SAVE_BATCH_SIZE = 50  # Articles buffered in memory before appending them to the corpus
 
-def get_existing_urls(csv_file: str) -> set:
-    """Reads the CSV file and returns a set of URLs that are already saved."""
-    if os.path.exists(csv_file) and os.path.getsize(csv_file) > 0:
-        try:
-            # We only read the 'url' column to save memory
-            df = pd.read_csv(csv_file, usecols=['url'])
-            return set(df['url'].tolist())
-        except Exception as e:
-            print(f"Warning: Could not read existing CSV ({e}). Starting fresh.")
-    return set()
 
-
-def clean_source_file(source_file: str, urls_to_remove: list):
-    """Removes specific URLs (e.g., 403 Forbidden) from the source text file."""
-    if not urls_to_remove:
+def import_existing_corpus(store: UrlStore, corpus_dir: str, legacy_csv: str = LEGACY_ARTICLES_CSV):
+    """
+    One-off migration: marks every URL already saved in the corpus as fetched in the URL store.
+    If the corpus doesn't exist yet, the articles of the old CSV file are migrated into it first.
+    """
+    if store.is_imported(corpus_dir):
         return
 
-    print(f"\nCleaning up source file: Removing {len(urls_to_remove)} broken URLs...")
+    if not corpus_exists(corpus_dir) and legacy_csv and os.path.exists(legacy_csv):
+        migrate_csv(legacy_csv, corpus_dir)
+
+    # Nothing to import yet; checked again on the next run instead of being marked as done
+    if not corpus_exists(corpus_dir):
+        return
 
     try:
-        with open(source_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        # We only read the 'url' and 'label' columns to save memory
+        df = read_corpus(corpus_dir, columns=['url', 'label']).to_pandas()
+        for label, urls in df.groupby('label')['url']:
+            store.add_many(urls.tolist(), int(label), state=FETCHED, overwrite_state=True)
+        print(f"Imported {len(df)} already saved URLs from {corpus_dir} into the URL store.")
+    except Exception as e:
+        print(f"Warning: Could not read existing corpus ({e}). Starting fresh.")
+        return
 
-        remove_set = set(urls_to_remove)
+    store.mark_imported(corpus_dir)
+    store.commit()
 
-        with open(source_file, "w", encoding="utf-8") as f:
-            for line in lines:
-                if line.strip() not in remove_set:
-                    f.write(line)
-        print("Source file updated successfully.")
-    except Exception as e:
-        print(f"Error updating source file: {e}")
 
+def _save_batch(store: UrlStore, rows: list, output_dir: str) -> int:
+    """
+    Appends a batch of article rows to the corpus as new Parquet files, marks them as fetched
+    in the URL store, and returns the number of rows written.
+    """
+    append_rows(rows, output_dir)
+
+    store.set_state([row["url"] for row in rows], FETCHED)
+    store.commit()
+    return len(rows)
 
-def process_articles(source_file: str, label: int, output_csv: str = "../../data/articles_example.csv"):
+
+def process_articles(source_file: str, label: int, output_dir: str = ARTICLES_DIR,
+                     batch_size: int = SAVE_BATCH_SIZE, store_path: str = DEFAULT_STORE_PATH):
     """
-    Reads URLs from a text file, downloads the articles, saves them to CSV,
-    and removes broken links (403 Forbidden) from the source file.
+    Picks up the URLs of a text file that are still waiting to be downloaded (tracked in the URL store),
+    downloads the articles concurrently, appends them to the Parquet corpus in batches,
+    and marks broken links (403 Forbidden) so they are never retried.
     """
     print(f"\n=== STARTING PROCESS: {source_file} ===")
 
-    # 1. Load Source URLs
+    # 1. Check the Source File
     if not os.path.exists(source_file):
         print(f"Error: Source file not found: {source_file}")
         return
 
-    with open(source_file, "r", encoding="utf-8") as f:
-        source_urls = set(line.strip() for line in f if line.strip())
-
-    # 2. Load Existing URLs (to avoid duplicates)
-    existing_urls = get_existing_urls(output_csv)
-    print(f"Total in source: {len(source_urls)} | Already in CSV: {len(existing_urls)}")
-
-    # 3. Filter URLs to process
-    urls_to_process = list(source_urls - existing_urls)
-    print(f"Articles to download: {len(urls_to_process)}")
-    print("-" * 40)
-
-    if not urls_to_process:
-        print("No new articles to process.")
-        return
-
-    # 4. Download and Parse
-    new_data = []
-    broken_urls_403 = []
-    success_count = 0
-    error_count = 0
-
-    for url in urls_to_process:
-        try:
-            article = Article(url)
-            article.download()
-            article.parse()
-
-            # Optional: Minimal content check
-            if not article.text:
-                print(f"Warning: Empty text extracted from {url}")
-
-            new_data.append({
-                "url": url,
-                "title": article.title,
-                "text": article.text,
-                "label": label
-            })
-
-            print(f"Success: {url}")
-            success_count += 1
-
-        except Exception as e:
-            error_msg = str(e)
-            print(f"Error ({url}): {error_msg}")
-            error_count += 1
-
-            # Detect 403 Forbidden errors to remove them later
-            if "403" in error_msg:
-                print(f"--> 403 FORBIDDEN detected. Marking for deletion.")
-                broken_urls_403.append(url)
-
-    # 5. Save to CSV
-    if new_data:
-        df_new = pd.DataFrame(new_data)
-        # Check if we need to write the header (only if file doesn't exist)
-        write_header = not os.path.exists(output_csv)
-
-        df_new.to_csv(output_csv, mode='a', index=False, header=write_header, encoding='utf-8')
-        print(f"\nSaved {len(new_data)} new articles to {output_csv}.")
-
-    # 6. Clean up broken links from source file
-    if broken_urls_403:
-        clean_source_file(source_file, broken_urls_403)
-
-    print(f"\nSUMMARY: {success_count} succeeded, {error_count} failed ({len(broken_urls_403)} removed due to 403).")
+    with UrlStore(store_path) as store:
+        # 2. Register new lines of the source file and the URLs already in the corpus (to avoid duplicates)
+        # The file is read to its end: the shipped lists have no newline after their last URL
+        new_in_source = store.sync_file(source_file, label, complete=True)
+        import_existing_corpus(store, output_dir)
+        store.commit()
+        print(f"New in source: {new_in_source} | Already fetched: {store.count(FETCHED, label)}")
+
+        # 3. Pending URLs
+        urls_to_process = store.urls(DISCOVERED, label)
+        print(f"Articles to download: {len(urls_to_process)}")
+        print("-" * 40)
+
+        if not urls_to_process:
+            print("No new articles to process.")
+            return
+
+        # 4. Download and Parse (concurrently), saving to the corpus in batches
+        batch = []
+        saved_count = 0
+        broken_count_403 = 0
+        success_count = 0
+        error_count = 0
+
+        for url, article, error in download_articles(urls_to_process):
+            if error is None:
+                # Optional: Minimal content check
+                if not article["text"]:
+                    print(f"Warning: Empty text extracted from {url}")
+
+                batch.append({
+                    "url": url,
+                    "title": article["title"],
+                    "text": article["text"],
+                    "label": label
+                })
+
+                print(f"Success: {url}")
+                success_count += 1
+            else:
+                print(f"Error ({url}): {error}")
+                error_count += 1
+
+                # Detect 403 Forbidden errors, so they are never retried
+                if isinstance(error, DownloadError) and error.status_code == 403:
+                    print(f"--> 403 FORBIDDEN detected. Marking as broken.")
+                    store.set_state([url], FAILED_403)
+                    broken_count_403 += 1
+
+            # 5. Save to the corpus (a crash loses at most one batch)
+            if len(batch) >= batch_size:
+                saved_count += _save_batch(store, batch, output_dir)
+                batch = []
+
+        if batch:
+            saved_count += _save_batch(store, batch, output_dir)
+
+        if saved_count:
+            print(f"\nSaved {saved_count} new articles to {output_dir}.")
+
+    print(f"\nSUMMARY: {success_count} succeeded, {error_count} failed ({broken_count_403} marked as 403).")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+import argparse
+import csv
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from model_loader import load_model
+from url_store import canonicalize_url, ends_with_newline
+
+# --- CONFIGURATION ---
+
+MODEL_PATH = '../../models/ensemble_pipeline_id1_0_89.joblib'
+OUTPUT_FILE = '../../data/scores.csv'
+
+CHUNK_SIZE = 500                     # Articles sent to a worker at once
+MAX_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+MAX_PENDING_PER_WORKER = 2           # Chunks read ahead per worker; bounds the memory use of the reader
+OUTPUT_COLUMNS = ["url", "label", "score", "model"]
+
+# Filled once per worker process by _init_worker
+_model = None
+
+
+# --- FUNCTIONS ---
+
+def shard_of(url: str, num_shards: int) -> int:
+    """Stable shard number of a URL (the same on every machine and Python version)."""
+    digest = hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def model_id(model_path: str) -> str:
+    """
+    The model column of the output: file name plus a hash of the file's content, so a model
+    retrained and saved under the same name counts as a different model.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{os.path.basename(model_path)}@{digest.hexdigest()}"
+
+
+def _input_columns(input_path: str) -> list:
+    if input_path.endswith(".csv"):
+        return list(pd.read_csv(input_path, encoding="utf-8-sig", nrows=0).columns)
+
+    import pyarrow.dataset as ds
+    from corpus import PARTITIONING
+    return ds.dataset(input_path, format="parquet", partitioning=PARTITIONING).schema.names
+
+
+def read_chunks(input_path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Streams (urls, texts, preprocess) chunks from an articles CSV or a Parquet corpus directory.
+    Already preprocessed inputs (with a 'cleaned_text' column) skip the spaCy cleaning.
+    Raw articles are scored on 'title text', as in classifier.fetch_article_content.
+    """
+    columns = _input_columns(input_path)
+    preprocessed = "cleaned_text" in columns
+    wanted = ["url", "cleaned_text"] if preprocessed else ["url", "title", "text"]
+
+    missing = [column for column in wanted if column not in columns]
+    if missing:
+        raise ValueError(f"Missing columns in {input_path}: {missing}")
+
+    if input_path.endswith(".csv"):
+        frames = pd.read_csv(input_path, encoding="utf-8-sig", usecols=wanted, chunksize=chunk_size)
+    else:
+        from corpus import iter_batches
+        frames = (batch.to_pandas() for batch in iter_batches(input_path, wanted, batch_size=chunk_size))
+
+    for df in frames:
+        df = df.dropna(subset=["url"])
+        if preprocessed:
+            texts = df["cleaned_text"].fillna("").astype(str)
+        else:
+            texts = df["title"].fillna("").astype(str) + " " + df["text"].fillna("").astype(str)
+        yield df["url"].tolist(), texts.tolist(), not preprocessed
+
+
+def load_scored_urls(output_file: str, model_name: str) -> set:
+    """
+    URLs already scored by this model in the output file, so an interrupted run can continue
+    where it stopped. Rows written by other models don't count: re-scoring after a model update
+    into the same file scores everything again.
+    """
+    if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+        return set()
+
+    scored = set()
+    # A run killed mid-write can leave a truncated last line behind
+    for chunk in pd.read_csv(output_file, usecols=["url", "model"], chunksize=100000, on_bad_lines="skip"):
+        scored.update(chunk.loc[chunk["model"] == model_name, "url"].tolist())
+    return scored
+
+
+def _init_worker(model_path: str):
+    """Loads the model once per worker. Memory-mapped arrays are shared between the workers by the OS."""
+    global _model
+    _model = load_model(model_path, mmap=True)
+
+
+def _score_chunk(urls: list, texts: list, preprocess: bool) -> list:
+    from classifier import score_texts
+    from preprocessing import preprocess_texts
+
+    if preprocess:
+        # No shared preprocessing cache here: archive texts are seen once, and parallel writers would contend
+        texts = list(preprocess_texts(texts, n_process=1, cache_path=None))
+
+    scores = score_texts(_model, texts, preprocess=False)
+    return [(url, label, round(score, 6)) for url, (label, score) in zip(urls, scores)]
+
+
+def score_corpus(input_path: str, output_file: str = OUTPUT_FILE, model_path: str = MODEL_PATH,
+                 shard: int = 0, num_shards: int = 1, chunk_size: int = CHUNK_SIZE,
+                 max_workers: int = MAX_WORKERS) -> int:
+    """
+    Scores every article of input_path that belongs to this shard and hasn't been scored
+    by this model in output_file yet.
+    Results are appended to output_file as soon as a chunk is done, so the run can be interrupted
+    at any time and restarted with the same arguments. Returns the number of articles scored.
+    """
+    # 1. Skip what a previous run of the same model already wrote
+    model_name = model_id(model_path)
+    scored_urls = load_scored_urls(output_file, model_name)
+    if scored_urls:
+        print(f"Resuming: {len(scored_urls)} articles already scored by {model_name} in {output_file}.")
+
+    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    # A run killed mid-line leaves an unterminated row; the first new row must not be glued onto it
+    needs_newline = not ends_with_newline(output_file)
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    n_scored = 0
+    n_failed = 0
+    start = time.perf_counter()
+
+    with open(output_file, "a", encoding="utf-8", newline="") as f, \
+            ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                initargs=(model_path,)) as executor:
+        writer = csv.writer(f)
+        if needs_newline:
+            f.write("\n")
+        if write_header:
+            writer.writerow(OUTPUT_COLUMNS)
+
+        pending = {}  # future -> number of articles in its chunk
+
+        def collect(done):
+            nonlocal n_scored, n_failed
+            for future in done:
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    # Not written, so the next run retries these articles
+                    n_failed += pending.pop(future)
+                    print(f"Error scoring a chunk: {e}")
+                    continue
+                del pending[future]
+                writer.writerows(row + (model_name,) for row in rows)
+                n_scored += len(rows)
+            f.flush()
+            elapsed = time.perf_counter() - start
+            print(f"Scored {n_scored} articles ({n_scored / max(elapsed, 1e-9):.1f}/s)...")
+
+        # 2. Stream the input, keeping a bounded number of chunks in flight
+        for urls, texts, preprocess in read_chunks(input_path, chunk_size):
+            selected = [
+                (url, text) for url, text in zip(urls, texts)
+                if url not in scored_urls and (num_shards == 1 or shard_of(url, num_shards) == shard)
+            ]
+            if not selected:
+                continue
+
+            future = executor.submit(_score_chunk, [url for url, _ in selected],
+                                     [text for _, text in selected], preprocess)
+            pending[future] = len(selected)
+
+            if len(pending) >= max_workers * MAX_PENDING_PER_WORKER:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+
+        # 3. Wait for the rest
+        if pending:
+            collect(wait(pending).done)
+
+    print(f"Done: {n_scored} articles scored, {n_failed} failed, results in {output_file}.")
+    return n_scored
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk scoring of an articles CSV or Parquet corpus.")
+    parser.add_argument("input", help="Articles CSV (url, title, text or url, cleaned_text) or corpus directory.")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--shard", default="0/1", help="This machine's part of the corpus, as i/N (0-based).")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    shard_index, shard_count = (int(part) for part in args.shard.split("/"))
+    if not 0 <= shard_index < shard_count:
+        parser.error("--shard must be i/N with 0 <= i < N")
+
+    score_corpus(args.input, args.output, args.model, shard_index, shard_count, args.chunk_size, args.workers)
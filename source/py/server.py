@@ -0,0 +1,269 @@
+import argparse
+import contextvars
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from cache import DEFAULT_CACHE_PATH, PredictionCache
+from classifier import LABELS, STATUS_FETCH_ERROR, STATUS_OK, STATUS_PREDICTION_ERROR, fetch_article_content, score_texts
+from model_loader import load_model
+
+# --- CONFIGURATION ---
+
+MODEL_PATH = '../../models/ensemble_pipeline_id1_0_89.joblib'
+HOST = "127.0.0.1"
+PORT = 8000
+
+MAX_BATCH_SIZE = 32     # Texts scored together in one vectorize+predict call
+MAX_WAIT_MS = 10        # How long the first request of a batch may wait for others to join
+FETCH_WORKERS = 16      # Concurrent URL downloads
+FETCH_TIMEOUT = 30      # Seconds
+SCORE_TIMEOUT = 60      # Seconds
+REQUEST_QUEUE_SIZE = 128  # Listen backlog; the stdlib default of 5 resets connections under load
+
+WARMUP_TEXT = "Az Országgyűlés a mai napon megszavazta az új költségvetési módosítást."
+
+
+# --- FUNCTIONS ---
+
+class ScoringServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a listen backlog sized for bursts of concurrent clients."""
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+class MicroBatcher:
+    """
+    Collects concurrently submitted texts into micro-batches on a single scoring thread.
+    A batch is scored as soon as it is full or the oldest text waited max_wait seconds.
+    """
+
+    def __init__(self, model, max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT_MS / 1000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="scoring", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queues a text for scoring; the future resolves to a (label index, propaganda score) tuple."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            try:
+                scores = score_texts(self.model, texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), score in zip(batch, scores):
+                future.set_result(score)
+
+
+def _make_result(input_data: str, is_url: bool) -> dict:
+    return {"input": input_data, "is_url": is_url, "label": None, "label_name": None,
+            "score": None, "status": STATUS_OK, "error": None}
+
+
+def make_handler(batcher: MicroBatcher, fetch_pool: ThreadPoolExecutor, cache: PredictionCache = None):
+    """Builds the request handler class bound to a batcher, a URL fetching pool and an optional cache."""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: dict, close: bool = False):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if close:
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_metrics(self):
+            recorder = metrics.get_recorder()
+            if not hasattr(recorder, "export"):
+                self._send_json(404, {"error": "Metrics are disabled"})
+                return
+
+            body, content_type = recorder.export()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/metrics":
+                self._send_metrics()
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            """POST /score with {"text": "..."} or {"url": "..."}."""
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                # The body can't be skipped, so the keep-alive connection can't be reused either
+                self._send_json(400, {"error": "Invalid Content-Length"}, close=True)
+                return
+
+            # Read before any reply, so an unread body is never parsed as the next request
+            body = self.rfile.read(length)
+            if self.path != "/score":
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "Invalid JSON body"})
+                return
+
+            if not isinstance(request, dict):
+                self._send_json(400, {"error": "The body must be a JSON object"})
+                return
+
+            url = request.get("url")
+            text = request.get("text")
+            if not url and not text:
+                self._send_json(400, {"error": "Provide 'text' or 'url'"})
+                return
+            if not isinstance(url or text, str):
+                self._send_json(400, {"error": "'text' and 'url' must be strings"})
+                return
+
+            with metrics.trace(input=(url or text)[:200], is_url=bool(url)):
+                status, result = self._score(url, text)
+                metrics.increment("results", result["status"])
+            self._send_json(status, result)
+
+        def _score(self, url, text):
+            """Returns the HTTP status and the result of one scoring request."""
+            result = _make_result(url or text, bool(url))
+
+            # 1. Get Text (if URL), on the fetch pool, never on the scoring thread
+            if url:
+                # The copied context carries the request's trace into the fetch thread
+                context = contextvars.copy_context()
+                fetch = cache.get_text if cache is not None else fetch_article_content
+                try:
+                    text = fetch_pool.submit(context.run, fetch, url).result(timeout=FETCH_TIMEOUT)
+                except Exception as e:
+                    metrics.increment("errors", "fetch", type(e).__name__)
+                    text = None
+                if not text:
+                    result["status"] = STATUS_FETCH_ERROR
+                    result["error"] = "Could not extract text from URL."
+                    return 502, result
+
+            # 2. Score as part of a micro-batch (the time includes waiting for the batch to fill)
+            cached = cache.get_prediction(text) if cache is not None else None
+            if cached is not None:
+                label, score = cached
+            else:
+                try:
+                    with metrics.stage("batched_score"):
+                        label, score = batcher.submit(text).result(timeout=SCORE_TIMEOUT)
+                except Exception as e:
+                    result["status"] = STATUS_PREDICTION_ERROR
+                    result["error"] = str(e)
+                    return 500, result
+                if cache is not None:
+                    cache.put_predictions([text], [(label, score)])
+
+            result.update({"label": label, "label_name": LABELS.get(label, "Unknown"), "score": score})
+            return 200, result
+
+        def log_message(self, format, *args):
+            pass  # Keep the console quiet under load
+
+    return ScoringHandler
+
+
+def serve(model_path: str = MODEL_PATH, host: str = HOST, port: int = PORT,
+          max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+          enable_metrics: bool = True, trace_log: str = None, cache_path: str = DEFAULT_CACHE_PATH,
+          use_cache: bool = True):
+    """Loads and warms up the model once, then serves scoring requests until interrupted."""
+    print(f"Loading model from {model_path}...")
+    model = load_model(model_path)
+
+    # Warm-up: loads spaCy and runs every pipeline step once before the first real request
+    score_texts(model, [WARMUP_TEXT])
+
+    # Enabled after the warm-up so the spaCy load doesn't end up in the latency histograms
+    if enable_metrics:
+        try:
+            metrics.enable_prometheus()
+        except ImportError:
+            print("Warning: prometheus_client is not installed, /metrics is disabled.")
+    metrics.set_trace_log(trace_log)
+
+    # Predictions cached on disk by a different model are dropped here
+    cache = PredictionCache(model, cache_path) if use_cache else None
+
+    batcher = MicroBatcher(model, max_batch_size, max_wait_ms / 1000)
+    fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+    httpd = ScoringServer((host, port), make_handler(batcher, fetch_pool, cache))
+
+    print(f"Serving on http://{host}:{port} (POST /score, GET /metrics). Press Ctrl+C to stop.")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        fetch_pool.shutdown(wait=False)
+        if cache is not None:
+            cache.close()
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP scoring service with dynamic micro-batching.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--no-metrics", action="store_true", help="Disable the Prometheus /metrics endpoint.")
+    parser.add_argument("--trace-log", default=None, help="Append a per-request JSON-lines trace to this file.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="SQLite file of the persistent cache tier.")
+    parser.add_argument("--no-cache", action="store_true", help="Download and score every request again.")
+    args = parser.parse_args()
+
+    serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait_ms,
+          not args.no_metrics, args.trace_log, args.cache_path, not args.no_cache)
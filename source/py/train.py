@@ -0,0 +1,145 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+from joblib import dump, load
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from corpus import PREPROCESSED_DIR, iter_batches, list_files
+from model_loader import latest_version, versioned_path
+
+# --- CONFIGURATION ---
+
+MODELS_DIR = '../../models'
+MODEL_NAME = 'incremental_pipeline'
+
+CLASSES = np.array([0, 1])
+N_FEATURES = 2 ** 20     # Hashed feature space (no vocabulary to fit or store)
+CHUNK_SIZE = 5000        # Documents per partial_fit call
+RANDOM_STATE = 42
+
+
+# --- FUNCTIONS ---
+
+def build_pipeline() -> Pipeline:
+    """Stateless hashed n-gram features + a linear model that supports partial_fit."""
+    return Pipeline([
+        ('hash', HashingVectorizer(ngram_range=(1, 2), token_pattern=r'\b\w+\b', n_features=N_FEATURES,
+                                   alternate_sign=False, norm='l2')),
+        # modified_huber gives predict_proba, so predict_bias can report a confidence
+        ('clf', SGDClassifier(loss='modified_huber', alpha=1e-5, random_state=RANDOM_STATE))
+    ])
+
+
+def metadata_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def _label_of(path: str) -> int:
+    """Label of a corpus file from its partition directory (label=<label>/...)."""
+    return int(path.split(os.sep)[0].split("=", 1)[1])
+
+
+def _mixed_chunks(corpus_dir: str, files: list, chunk_size: int, rng):
+    """
+    Streams (texts, labels) chunks that mix every label. The corpus is partitioned by label,
+    so reading it in file order would feed partial_fit one class at a time.
+    """
+    by_label = {}
+    for path in files:
+        by_label.setdefault(_label_of(path), []).append(path)
+
+    streams = [
+        iter_batches(corpus_dir, ['cleaned_text', 'label'], label_files, batch_size=max(1, chunk_size // len(by_label)))
+        for label_files in by_label.values()
+    ]
+
+    while streams:
+        texts, labels = [], []
+        for stream in list(streams):
+            batch = next(stream, None)
+            if batch is None:
+                streams.remove(stream)
+                continue
+            texts.extend(batch.column('cleaned_text').to_pylist())
+            labels.extend(batch.column('label').to_pylist())
+
+        if texts:
+            order = rng.permutation(len(texts))
+            yield [texts[i] for i in order], np.asarray(labels)[order]
+
+
+def train(corpus_dir: str = PREPROCESSED_DIR, models_dir: str = MODELS_DIR, name: str = MODEL_NAME,
+          chunk_size: int = CHUNK_SIZE, from_scratch: bool = False) -> str:
+    """
+    Updates the latest model version with the preprocessed articles it hasn't seen yet
+    (or trains a new one from the whole corpus) and saves the result as the next version.
+    Returns the path of the new version, or None if there was nothing new to learn.
+    """
+    # 1. Start from the latest version (if any)
+    version = latest_version(models_dir, name)
+    if version and not from_scratch:
+        previous_path = versioned_path(models_dir, name, version)
+        pipeline = load(previous_path)
+        with open(metadata_path(previous_path), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        print(f"Updating {previous_path} ({metadata['n_documents']} documents so far)...")
+    else:
+        pipeline = build_pipeline()
+        metadata = {"trained_files": [], "n_documents": 0, "parent_version": None}
+        print("Training a new model from scratch...")
+
+    # 2. Only the corpus files written since the last version (the corpus is append-only)
+    trained = set(metadata["trained_files"])
+    new_files = [path for path in list_files(corpus_dir) if path not in trained]
+    if not new_files:
+        print("There are no new articles to train on.")
+        return None
+
+    # 3. Stream the new documents through partial_fit
+    vectorizer = pipeline[:-1]
+    classifier = pipeline.steps[-1][1]
+    rng = np.random.default_rng(RANDOM_STATE + version)
+    n_documents = 0
+
+    for texts, labels in _mixed_chunks(corpus_dir, new_files, chunk_size, rng):
+        classifier.partial_fit(vectorizer.transform(texts), labels, classes=CLASSES)
+        n_documents += len(texts)
+        print(f"Trained on {n_documents} new documents...")
+
+    # 4. Save the next version with its metadata
+    new_version = version + 1
+    model_path = versioned_path(models_dir, name, new_version)
+    os.makedirs(models_dir, exist_ok=True)
+    dump(pipeline, model_path)
+
+    metadata = {
+        "version": new_version,
+        "parent_version": version if version and not from_scratch else None,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "n_documents": metadata["n_documents"] + n_documents,
+        "n_features": N_FEATURES,
+        "trained_files": sorted(trained | set(new_files))
+    }
+    with open(metadata_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Saved {model_path} ({metadata['n_documents']} documents).")
+    return model_path
+
+
+# --- EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core, incremental training on the preprocessed corpus.")
+    parser.add_argument("--corpus", default=PREPROCESSED_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--from-scratch", action="store_true", help="Ignore the previous versions.")
+    args = parser.parse_args()
+
+    train(args.corpus, args.models_dir, chunk_size=args.chunk_size, from_scratch=args.from_scratch)
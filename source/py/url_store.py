@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# --- CONFIGURATION ---
+
+DEFAULT_STORE_PATH = "../../data/urls.sqlite"
+
+# URL states, in the order the pipeline moves them forward
+DISCOVERED = "discovered"
+FETCHED = "fetched"
+FAILED_403 = "failed_403"
+PREPROCESSED = "preprocessed"
+
+# Query parameters that only track the reader and never change the article
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "ref_src"}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+# --- FUNCTIONS ---
+
+def canonicalize_url(url: str) -> str:
+    """
+    Returns the key a URL is stored under, so trivially different duplicates collapse:
+    http/https, host case, default ports, fragments and tracking parameters are ignored.
+    """
+    parts = urlsplit(url.strip())
+
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query_string = "?" + urlencode(sorted(query)) if query else ""
+
+    return f"//{host}{parts.path or '/'}{query_string}"
+
+
+def ends_with_newline(path: str) -> bool:
+    """True if the file is empty, missing, or its last line is terminated, i.e. an append starts on a new line."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class UrlStore:
+    """
+    SQLite index of every URL the pipeline has seen, with its label, state and matched keywords.
+    Writes are grouped into transactions; call commit() (or use the store as a context manager).
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                label INTEGER,
+                state TEXT NOT NULL,
+                keywords TEXT,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_urls_state_label ON urls (state, label);
+            CREATE TABLE IF NOT EXISTS imports (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        self.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __contains__(self, url: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM urls WHERE key = ?", (canonicalize_url(url),)).fetchone()
+        return row is not None
+
+    def add(self, url: str, label: int, keywords=(), state: str = DISCOVERED) -> bool:
+        """Adds a URL if it (or a duplicate of it) is not stored yet. Returns True if it was new."""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO urls (key, url, label, state, keywords, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (canonicalize_url(url), url.strip(), label, state, "|".join(keywords) or None, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def add_many(self, urls, label: int, state: str = DISCOVERED, overwrite_state: bool = False) -> int:
+        """
+        Adds many URLs at once and returns the number of new ones.
+        With overwrite_state=True, URLs that are already stored are moved to the given state
+        (and count towards the returned number too).
+        """
+        now = time.time()
+        rows = [(canonicalize_url(url), url.strip(), label, state, now) for url in urls if url.strip()]
+        before = self.conn.total_changes
+
+        if overwrite_state:
+            self.conn.executemany(
+                "INSERT INTO urls (key, url, label, state, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                rows
+            )
+        else:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (key, url, label, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return self.conn.total_changes - before
+
+    def set_state(self, urls, state: str):
+        """Moves the given URLs to a new state."""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE urls SET state = ?, updated_at = ? WHERE key = ?",
+            [(state, now, canonicalize_url(url)) for url in urls]
+        )
+
+    def urls(self, state: str, label: int = None) -> list:
+        """Returns the URLs waiting in the given state (optionally only with the given label)."""
+        if label is None:
+            rows = self.conn.execute("SELECT url FROM urls WHERE state = ?", (state,))
+        else:
+            rows = self.conn.execute("SELECT url FROM urls WHERE state = ? AND label = ?", (state, label))
+        return [row[0] for row in rows]
+
+    def keywords(self, url: str) -> tuple:
+        """Returns the keywords the URL matched when it was discovered."""
+        row = self.conn.execute("SELECT keywords FROM urls WHERE key = ?", (canonicalize_url(url),)).fetchone()
+        return tuple(row[0].split("|")) if row and row[0] else ()
+
+    def count(self, state: str = None, label: int = None) -> int:
+        query = "SELECT COUNT(*) FROM urls WHERE 1 = 1"
+        params = []
+        if state is not None:
+            query += " AND state = ?"
+            params.append(state)
+        if label is not None:
+            query += " AND label = ?"
+            params.append(label)
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def is_imported(self, path: str) -> bool:
+        """True if a one-off import of the file was already recorded with mark_imported()."""
+        row = self.conn.execute("SELECT 1 FROM imports WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return row is not None
+
+    def mark_imported(self, path: str):
+        self.conn.execute("INSERT OR IGNORE INTO imports (path, offset) VALUES (?, -1)", (os.path.abspath(path),))
+
+    def sync_file(self, path: str, label: int, complete: bool = False) -> int:
+        """
+        Imports the lines appended to a URL text file since the last sync, as DISCOVERED URLs.
+        Only the new tail of the file is read; a file that shrank (was rewritten) is read again in full.
+        A last line without a newline may still be being written, so it is left for the next sync,
+        unless complete=True (nobody is appending to the file, e.g. a hand-edited list).
+        Returns the number of new URLs.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        key = os.path.abspath(path)
+        row = self.conn.execute("SELECT offset FROM imports WHERE path = ?", (key,)).fetchone()
+        offset = row[0] if row else 0
+        if offset > os.path.getsize(path):
+            offset = 0
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Leave a partially written last line for the next sync
+        end = len(data) if complete else data.rfind(b"\n") + 1
+        lines = data[:end].decode("utf-8").splitlines()
+
+        added = self.add_many(lines, label)
+        self.conn.execute(
+            "INSERT INTO imports (path, offset) VALUES (?, ?) ON CONFLICT (path) DO UPDATE SET offset = excluded.offset",
+            (key, offset + end)
+        )
+        return added